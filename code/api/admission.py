@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+from prometheus_client import Counter, Gauge
+
+admission_in_flight = Gauge('admission_in_flight', 'Requests currently admitted, per route class', ['route_class'])
+admission_queue_depth = Gauge('admission_queue_depth', 'Requests waiting for admission, per route class', ['route_class'])
+admission_rejections = Counter('admission_rejections_total', 'Requests rejected by admission control',
+                               ['route_class', 'reason'])
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted, either because the wait queue is full
+    or because no slot became free in time.
+    """
+
+    def __init__(self, route_class, reason):
+        super().__init__(f"{route_class}: {reason}")
+        self.route_class = route_class
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded wait queue for one class of routes.
+
+    At most `max_concurrency` requests run at once. Up to `max_queue` more may wait,
+    each for at most `queue_timeout` seconds. Anything beyond that is rejected right away,
+    so overload turns into fast rejections instead of ever-growing latency.
+    """
+
+    def __init__(self, route_class, max_concurrency, max_queue, queue_timeout):
+        self.route_class = route_class
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+
+    def reject(self, reason):
+        admission_rejections.labels(route_class=self.route_class, reason=reason).inc()
+        raise AdmissionRejected(self.route_class, reason)
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold one slot for the duration of the block.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out.
+        """
+        if self.semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.reject("queue_full")
+            self.waiting += 1
+            admission_queue_depth.labels(route_class=self.route_class).set(self.waiting)
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.reject("timeout")
+            finally:
+                self.waiting -= 1
+                admission_queue_depth.labels(route_class=self.route_class).set(self.waiting)
+        else:
+            await self.semaphore.acquire()
+
+        admission_in_flight.labels(route_class=self.route_class).inc()
+        try:
+            yield
+        finally:
+            admission_in_flight.labels(route_class=self.route_class).dec()
+            self.semaphore.release()
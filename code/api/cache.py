@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries expire after a fixed time-to-live.
+
+    Not thread-safe; meant to be used from the single event loop of one API worker.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, timer=time.monotonic, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.on_evict = on_evict  # called with (key, value) when an entry is evicted to make room
+        self.entries = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key, or default if it is missing or expired.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at <= self.timer():
+            del self.entries[key]
+            return default
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        """
+        Store value under key, evicting the least recently used entry when full.
+        """
+        self.entries[key] = (value, self.timer() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            evicted_key, (evicted_value, _) = self.entries.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted_value)
+
+    def invalidate(self, key):
+        """
+        Drop key from the cache if present.
+        """
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class PredictionCache:
+    """
+    Cache of prediction results keyed by a content hash of the scoring payload and tagged
+    with the model version that produced them.
+
+    Concurrent lookups of the same missing payload share one upstream call (single-flight).
+    Switching to a new model version drops every cached result.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300.0, on_evict=None):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl, on_evict=on_evict)
+        self.model_version = None
+        self.in_flight = {}
+
+    @staticmethod
+    def key_for(payload):
+        """
+        Content hash of a JSON serializable payload, independent of key order.
+        """
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def set_model_version(self, version):
+        """
+        Record the model version currently served upstream, clearing the cache when it changes.
+
+        Returns:
+            bool: True if the version changed.
+        """
+        if not version or version == self.model_version:
+            return False
+        self.entries.clear()
+        self.model_version = version
+        return True
+
+    async def get_or_fetch(self, payload, fetch):
+        """
+        Return the cached result for payload, or compute it with fetch().
+
+        Args:
+            payload: JSON serializable scoring payload.
+            fetch: Coroutine function producing the result on a miss.
+
+        Returns:
+            tuple: The result and how it was served: 'hit', 'coalesced' or 'miss'.
+        """
+        key = self.key_for(payload)
+        cached = self.entries.get((self.model_version, key))
+        if cached is not None:
+            return cached, "hit"
+
+        future = self.in_flight.get(key)
+        if future is not None:
+            # Shield so a cancelled follower does not cancel the shared call
+            return await asyncio.shield(future), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self.in_flight[key]
+        # Tag with the version known after the call, fetch() may have just updated it
+        self.entries.set((self.model_version, key), result)
+        future.set_result(result)
+        return result, "miss"
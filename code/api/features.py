@@ -0,0 +1,240 @@
+import os
+from operator import attrgetter
+from typing import Any, Dict, List, Literal
+
+import numpy as np
+from pydantic import BaseModel, Field, field_validator
+
+# Maximum number of items accepted by a single /predict/batch call
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "5000"))
+
+
+class FeatureLayout:
+    """
+    Precompiled mapping from scoring fields to the model input matrix.
+
+    Built once per model. It checks that the renamed fields match the columns the model was
+    trained with (`feature_names_in_`) and records where each column comes from, so a request
+    is turned into a float64 row in the model's column order without a DataFrame or a rename.
+
+    Args:
+        fields (list of str): Scoring field names, in wire (compact) order.
+        column_renames (dict): Field name to model column name, for the names that differ.
+        model: Fitted estimator, used for `feature_names_in_` or `n_features_in_`.
+
+    Raises:
+        ValueError: If the fields do not provide exactly the model's columns.
+    """
+
+    def __init__(self, fields, column_renames, model=None):
+        columns = [column_renames.get(name, name) for name in fields]
+        feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is None:
+            # Model fitted without column names, it can only be fed in field order
+            n_features = getattr(model, "n_features_in_", len(columns))
+            if n_features != len(columns):
+                raise ValueError(f"Model expects {n_features} features, the scoring fields provide {len(columns)}")
+            feature_names = columns
+        feature_names = [str(name) for name in feature_names]
+
+        missing = [name for name in feature_names if name not in columns]
+        unexpected = [name for name in columns if name not in feature_names]
+        if missing or unexpected or len(set(columns)) != len(columns):
+            raise ValueError(f"Scoring fields do not match the model columns "
+                             f"(missing: {missing}, unexpected: {unexpected})")
+
+        position = {column: index for index, column in enumerate(columns)}
+        self.fields = list(fields)
+        self.feature_names = feature_names
+        # order[i] is the position, in wire order, of the i-th model column
+        self.order = np.array([position[name] for name in feature_names], dtype=np.intp)
+        self.in_wire_order = bool((self.order == np.arange(len(columns))).all())
+        model_fields = [self.fields[index] for index in self.order]
+        self.get_values = attrgetter(*model_fields)
+
+    def __len__(self):
+        return len(self.feature_names)
+
+    def row(self, item):
+        """
+        Model input for one validated item (a pydantic model or anything with the fields as attributes).
+
+        Returns:
+            ndarray: Shape (1, n_features), float64.
+        """
+        return np.array([self.get_values(item)], dtype=np.float64)
+
+    def matrix(self, items):
+        """
+        Model input for many validated items.
+
+        Returns:
+            ndarray: Shape (len(items), n_features), float64.
+        """
+        matrix = np.empty((len(items), len(self)), dtype=np.float64)
+        for index, item in enumerate(items):
+            matrix[index] = self.get_values(item)
+        return matrix
+
+    def from_values(self, rows):
+        """
+        Model input for rows of values in wire order, as sent in the compact format.
+
+        Returns:
+            ndarray: Shape (len(rows), n_features), float64.
+        """
+        matrix = np.asarray(rows, dtype=np.float64).reshape(len(rows), len(self))
+        return matrix if self.in_wire_order else matrix[:, self.order]
+
+
+# Mapping of the API field names to the column names the model was trained with
+COLUMN_RENAMES = {
+    "Minutes_Remaining": "Minutes Remaining",
+    "Seconds_Remaining": "Seconds Remaining",
+    "Shot_Distance": "Shot Distance",
+    "X_Location": "X Location",
+    "Y_Location": "Y Location",
+    # "Shot_Made_Flag": "Shot Made Flag",
+    "Action_Type_Frequency": "Action Type_Frequency",
+    "Team_Name_Frequency": "Team Name_Frequency",
+    "Home_Team_Frequency": "Home Team_Frequency",
+    "Away_Team_Frequency": "Away Team_Frequency",
+    "ShotType_2PT_Field_Goal": "ShotType_2PT Field Goal",
+    "ShotType_3PT_Field_Goal": "ShotType_3PT Field Goal",
+    "ShotZoneBasic_Above_the_Break_3": "ShotZoneBasic_Above the Break 3",
+    "ShotZoneBasic_Backcourt": "ShotZoneBasic_Backcourt",
+    "ShotZoneBasic_In_The_Paint_Non_RA": "ShotZoneBasic_In The Paint (Non-RA)",
+    "ShotZoneBasic_Left_Corner_3": "ShotZoneBasic_Left Corner 3",
+    "ShotZoneBasic_Mid_Range": "ShotZoneBasic_Mid-Range",
+    "ShotZoneBasic_Restricted_Area": "ShotZoneBasic_Restricted Area",
+    "ShotZoneBasic_Right_Corner_3": "ShotZoneBasic_Right Corner 3",
+    "ShotZoneArea_Back_Court_BC": "ShotZoneArea_Back Court(BC)",
+    "ShotZoneArea_Center_C": "ShotZoneArea_Center(C)",
+    "ShotZoneArea_Left_Side_Center_LC": "ShotZoneArea_Left Side Center(LC)",
+    "ShotZoneArea_Left_Side_L": "ShotZoneArea_Left Side(L)",
+    "ShotZoneArea_Right_Side_Center_RC": "ShotZoneArea_Right Side Center(RC)",
+    "ShotZoneArea_Right_Side_R": "ShotZoneArea_Right Side(R)",
+    "ShotZoneRange_16_24_ft": "ShotZoneRange_16-24 ft.",
+    "ShotZoneRange_24_ft": "ShotZoneRange_24+ ft.",
+    "ShotZoneRange_8_16_ft": "ShotZoneRange_8-16 ft.",
+    "ShotZoneRange_Back_Court_Shot": "ShotZoneRange_Back Court Shot",
+    "ShotZoneRange_Less_Than_8_ft": "ShotZoneRange_Less Than 8 ft.",
+    "SeasonType_Playoffs": "SeasonType_Playoffs",
+    "SeasonType_Regular_Season": "SeasonType_Regular Season",
+    "Game_ID_Frequency": "Game ID_Frequency",
+    "Game_Event_ID_Frequency": "Game Event ID_Frequency",
+    "Player_ID_Frequency": "Player ID_Frequency",
+    "Year": "Year",
+    "Month": "Month",
+    "Day": "Day",
+    "Day_of_Week": "Day_of_Week"
+}
+
+
+class ScoringItem(BaseModel):
+    """
+    Model representing scoring parameters for prediction.
+    """
+    Period: float
+    Minutes_Remaining: float
+    Seconds_Remaining: float
+    Shot_Distance: float
+    X_Location: float
+    Y_Location: float
+    Action_Type_Frequency: float
+    Team_Name_Frequency: float
+    Home_Team_Frequency: float
+    Away_Team_Frequency: float
+    ShotType_2PT_Field_Goal: int
+    ShotType_3PT_Field_Goal: int
+    ShotZoneBasic_Above_the_Break_3: int
+    ShotZoneBasic_Backcourt: int
+    ShotZoneBasic_In_The_Paint_Non_RA: int
+    ShotZoneBasic_Left_Corner_3: int
+    ShotZoneBasic_Mid_Range: int
+    ShotZoneBasic_Restricted_Area: int
+    ShotZoneBasic_Right_Corner_3: int
+    ShotZoneArea_Back_Court_BC: int
+    ShotZoneArea_Center_C: int
+    ShotZoneArea_Left_Side_Center_LC: int
+    ShotZoneArea_Left_Side_L: int
+    ShotZoneArea_Right_Side_Center_RC: int
+    ShotZoneArea_Right_Side_R: int
+    ShotZoneRange_16_24_ft: int
+    ShotZoneRange_24_ft: int
+    ShotZoneRange_8_16_ft: int
+    ShotZoneRange_Back_Court_Shot: int
+    ShotZoneRange_Less_Than_8_ft: int
+    SeasonType_Playoffs: int
+    SeasonType_Regular_Season: int
+    Game_ID_Frequency: float
+    Game_Event_ID_Frequency: float
+    Player_ID_Frequency: float
+    Year: int
+    Month: int
+    Day: int
+    Day_of_Week: int
+
+
+# Compact wire format: the ScoringItem values as a positional array in SCORING_FIELDS order.
+# Bump SCORING_SCHEMA_VERSION whenever fields are added, removed or reordered.
+SCORING_SCHEMA_VERSION = 1
+SCORING_FIELDS = list(ScoringItem.model_fields)
+INT_SCORING_FIELDS = {name for name, field in ScoringItem.model_fields.items() if field.annotation is int}
+
+
+def check_int_values(values):
+    """
+    Reject a fractional value for an int field of ScoringItem, as ScoringItem itself does.
+    """
+    for name, value in zip(SCORING_FIELDS, values):
+        if name in INT_SCORING_FIELDS and not float(value).is_integer():
+            raise ValueError(f"{name}: got a number with a fractional part")
+    return values
+
+
+class CompactScoringItem(BaseModel):
+    """
+    ScoringItem in the compact wire format.
+    """
+    schema_version: Literal[SCORING_SCHEMA_VERSION]
+    values: List[float] = Field(min_length=len(SCORING_FIELDS), max_length=len(SCORING_FIELDS))
+
+    @field_validator('values')
+    @classmethod
+    def int_fields_are_integral(cls, values):
+        return check_int_values(values)
+
+
+class CompactBatchScoringRequest(BaseModel):
+    """
+    Batch of ScoringItems in the compact wire format. Unlike BatchScoringRequest the
+    whole batch is rejected if any row is malformed.
+    """
+    schema_version: Literal[SCORING_SCHEMA_VERSION]
+    rows: List[List[float]] = Field(max_length=PREDICT_BATCH_MAX_ITEMS)
+
+    @field_validator('rows')
+    @classmethod
+    def int_fields_are_integral(cls, rows):
+        for index, row in enumerate(rows):
+            try:
+                check_int_values(row)
+            except ValueError as e:
+                raise ValueError(f"Row {index}: {e}")
+        return rows
+
+
+class BatchScoringRequest(BaseModel):
+    """
+    Batch of raw scoring items. Items are validated one by one so a bad item
+    only fails itself and not the whole batch.
+    """
+    items: List[Dict[str, Any]] = Field(max_length=PREDICT_BATCH_MAX_ITEMS)
+
+
+def format_validation_error(error):
+    """
+    Turn a pydantic ValidationError into a short, JSON friendly message.
+    """
+    return "; ".join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
@@ -0,0 +1,147 @@
+import datetime
+import os
+import struct
+import zipfile
+import numpy as np
+
+
+class LinearScorer:
+    """
+    NumPy scorer for a binary logistic regression, computing the same probabilities and labels
+    as the sklearn model from a flat coefficient array and an intercept.
+
+    Any standardization applied during training is folded into the coefficients (see fuse_scaler),
+    so it scores raw feature values.
+
+    Args:
+        coef (array-like): One weight per feature, in feature_names order.
+        intercept (float): Bias term.
+        feature_names (list of str): Column order the coefficients refer to.
+        classes (array-like): Label returned for a negative and a positive decision, in that order.
+        metadata (dict): Free-form string metadata, e.g. the model version.
+    """
+
+    def __init__(self, coef, intercept, feature_names, classes=(0, 1), metadata=None):
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64).ravel()
+        self.intercept = float(intercept)
+        # Same attribute names as sklearn estimators, so FeatureLayout can validate against them
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(self.coef)
+        self.classes_ = np.asarray(classes)
+        self.metadata = dict(metadata or {})
+        if len(self.feature_names_in_) != self.n_features_in_ or len(self.classes_) != 2:
+            raise ValueError("Expected one feature name per coefficient and exactly two classes")
+
+    @classmethod
+    def from_estimator(cls, estimator, metadata=None):
+        """
+        Scorer equivalent to a fitted binary LogisticRegression, without any scaling.
+        """
+        return cls(estimator.coef_[0], estimator.intercept_[0], estimator.feature_names_in_, estimator.classes_,
+                   metadata)
+
+    def decision_function(self, features):
+        return features @ self.coef + self.intercept
+
+    def predict_proba(self, features):
+        """
+        Returns:
+            ndarray: Shape (n, 2), probabilities of the negative and the positive class.
+        """
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(features)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, features):
+        return self.classes_[(self.decision_function(features) > 0).astype(np.intp)]
+
+    def save(self, path):
+        """
+        Write the scorer as an .npz file readable without pickle.
+        """
+        np.savez(path, coef=self.coef, intercept=np.float64(self.intercept),
+                 feature_names=self.feature_names_in_.astype(str), classes=self.classes_,
+                 metadata_keys=np.array(list(self.metadata), dtype=str),
+                 metadata_values=np.array([str(value) for value in self.metadata.values()], dtype=str))
+
+    @classmethod
+    def load(cls, path, mmap=False):
+        """
+        Read a scorer written by save().
+
+        Args:
+            path (str): The .npz file.
+            mmap (bool): Map the coefficients read-only from the file instead of copying them,
+                so every process serving the same file shares one copy in the page cache.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            metadata = dict(zip(data['metadata_keys'].tolist(), data['metadata_values'].tolist()))
+            coef = map_npz_member(path, 'coef') if mmap else data['coef']
+            return cls(coef, data['intercept'], data['feature_names'].tolist(), data['classes'], metadata)
+
+
+def map_npz_member(path, name):
+    """
+    Memory-map one array of an uncompressed .npz file (as written by np.savez) read-only.
+
+    np.load ignores mmap_mode for .npz files, but their members are stored as plain .npy
+    files inside the zip, so the array data sits at a fixed offset of the archive.
+    """
+    with zipfile.ZipFile(path) as archive:
+        info = archive.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{name} is compressed in {path} and cannot be memory-mapped")
+    with open(path, 'rb') as f:
+        # Local file header: 30 fixed bytes, then the file name and the extra field
+        f.seek(info.header_offset)
+        header = f.read(30)
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        if np.lib.format.read_magic(f) == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+
+
+def fuse_scaler(estimator, scaler, scaled_columns, version=None):
+    """
+    Fold a StandardScaler fitted on some columns into the weights of a logistic regression
+    trained on the scaled data.
+
+    With x' = (x - mean) / scale on the scaled columns, w·x' + b equals
+    (w / scale)·x + (b - sum(w * mean / scale)), so the fused scorer takes unscaled values.
+
+    Args:
+        estimator: Fitted binary LogisticRegression with feature_names_in_.
+        scaler: Fitted StandardScaler.
+        scaled_columns (list of str): Columns the scaler was fitted on, in its order.
+        version (str): Model version stored in the metadata.
+
+    Returns:
+        LinearScorer: Scorer for unscaled feature values.
+    """
+    feature_names = list(estimator.feature_names_in_)
+    coef = np.array(estimator.coef_[0], dtype=np.float64)
+    intercept = float(estimator.intercept_[0])
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(len(scaled_columns))
+    scale = scaler.scale_ if scaler.with_std else np.ones(len(scaled_columns))
+    for column, column_mean, column_scale in zip(scaled_columns, mean, scale):
+        index = feature_names.index(column)
+        intercept -= coef[index] * column_mean / column_scale
+        coef[index] /= column_scale
+
+    metadata = {
+        'version': version or '',
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'source': type(estimator).__name__,
+        'scaled_columns': ','.join(scaled_columns),
+    }
+    return LinearScorer(coef, intercept, feature_names, estimator.classes_, metadata)
+
+
+def scorer_path_for(model_path):
+    """
+    Path of the fused scoring artifact stored next to a joblib model file.
+    """
+    return os.path.splitext(model_path)[0] + '.npz'
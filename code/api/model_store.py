@@ -0,0 +1,430 @@
+import asyncio
+import glob
+import json
+import os
+import re
+import tempfile
+import uuid
+from collections import OrderedDict
+import numpy as np
+from joblib import load
+from prometheus_client import Counter, Gauge
+
+from api.features import FeatureLayout
+from api.linear_scorer import LinearScorer, scorer_path_for
+
+# livemax: with several worker processes a version is reported as served if any live worker serves it
+served_model_info = Gauge('served_model_info', 'Model version currently served (1)',
+                          ['model_version'], multiprocess_mode='livemax')
+model_reloads = Counter('model_reloads_total', 'Model swaps by outcome', ['result'])
+model_cache_bytes = Gauge('model_cache_bytes', 'Estimated memory of the models held by the version cache',
+                          multiprocess_mode='livesum')
+model_cache_loads = Counter('model_cache_loads_total', 'Models loaded on demand by version')
+model_cache_evictions = Counter('model_cache_evictions_total', 'Models evicted from the version cache to free memory')
+
+# Model version tags, e.g. 'model_best_lr-v3-20240704'
+MODEL_VERSION_PATTERN = r"^[\w.-]+$"
+
+
+class ServedModel:
+    """
+    A model file loaded, validated against the scoring fields and ready to serve.
+
+    Scoring goes through a LinearScorer: the fused artifact written by training next to the joblib
+    file when there is one (scaler folded in), otherwise one built from the logistic regression
+    itself. Other estimators are scored by sklearn.
+
+    Args:
+        path (str): Path of the joblib file.
+        fields (list of str): Scoring field names, in wire order.
+        column_renames (dict): Field name to model column name, for the names that differ.
+        mmap (bool): Memory-map the model arrays read-only, so worker processes share them.
+
+    Raises:
+        ValueError: If the model does not expect exactly the scoring fields.
+    """
+
+    def __init__(self, path, fields, column_renames, mmap=False):
+        self.path = path
+        # Version tag, e.g. 'model_best_lr-v6-20240629'
+        self.version = os.path.splitext(os.path.basename(path))[0]
+        scorer_path = scorer_path_for(path)
+        if os.path.exists(scorer_path):
+            self.estimator = LinearScorer.load(scorer_path, mmap=mmap)
+            # Estimated memory footprint, the size of the file the model was read from
+            self.nbytes = os.path.getsize(scorer_path)
+        else:
+            self.nbytes = os.path.getsize(path)
+            self.estimator = load(path, mmap_mode="r" if mmap else None)
+            if (hasattr(self.estimator, "coef_") and hasattr(self.estimator, "feature_names_in_")
+                    and len(self.estimator.classes_) == 2):
+                self.estimator = LinearScorer.from_estimator(self.estimator)
+        self.layout = FeatureLayout(fields, column_renames, self.estimator)
+
+    def predict(self, features):
+        return self.estimator.predict(features)
+
+    def warm_up(self):
+        """
+        Run a throwaway prediction so the first real request does not pay for lazy initialisation.
+        """
+        self.predict(np.zeros((2, len(self.layout))))
+
+
+class ModelStore:
+    """
+    Holds the active model and the one it replaced.
+
+    Swapping is a single attribute assignment, so a request that read `active` keeps scoring
+    with that model even if a new one is activated meanwhile. Rolling back restores the
+    previous model and remembers the replaced path so it is not picked up again automatically.
+    """
+
+    def __init__(self, active):
+        self.active = active
+        self.previous = None
+        self.rejected_paths = set()
+        served_model_info.labels(model_version=active.version).set(1)
+
+    def activate(self, model):
+        """
+        Serve model from now on, keeping the current one for rollback.
+        """
+        self.previous, self.active = self.active, model
+        # Set to 0 rather than removed, removal does not reach other processes in multiprocess mode
+        served_model_info.labels(model_version=self.previous.version).set(0)
+        served_model_info.labels(model_version=model.version).set(1)
+        model_reloads.labels(result="success").inc()
+        print(f"Serving model {model.version} (previous: {self.previous.version})")
+
+    def rollback(self):
+        """
+        Serve the previous model again.
+
+        Returns:
+            bool: False if there is no previous model.
+        """
+        if self.previous is None:
+            return False
+        self.rejected_paths.add(self.active.path)
+        rolled_back = self.active
+        self.active, self.previous = self.previous, None
+        served_model_info.labels(model_version=rolled_back.version).set(0)
+        served_model_info.labels(model_version=self.active.version).set(1)
+        model_reloads.labels(result="rollback").inc()
+        print(f"Rolled back from model {rolled_back.version} to {self.active.version}")
+        return True
+
+
+class ModelCache:
+    """
+    LRU of models addressed by version, loaded on first use.
+
+    The cache is bounded by the estimated memory of the loaded models (`ServedModel.nbytes`):
+    least recently used versions are evicted once `max_bytes` is exceeded, except pinned ones.
+    Concurrent requests for a version that is not loaded yet share one load (single-flight).
+
+    Args:
+        load_func: Blocking function returning the ServedModel for a version. Run in a worker thread.
+        max_bytes (int): Memory budget of the unpinned models.
+        pinned (iterable of str): Versions never evicted, see preload().
+    """
+
+    def __init__(self, load_func, max_bytes, pinned=()):
+        self.load_func = load_func
+        self.max_bytes = max_bytes
+        self.pinned = set(pinned)
+        self.models = OrderedDict()
+        self.loading = {}
+
+    @property
+    def nbytes(self):
+        return sum(model.nbytes for model in self.models.values())
+
+    async def get(self, version):
+        """
+        Return the model for version, loading it if needed.
+
+        Raises:
+            Whatever load_func raises, e.g. FileNotFoundError for an unknown version.
+        """
+        model = self.models.get(version)
+        if model is not None:
+            self.models.move_to_end(version)
+            return model
+
+        future = self.loading.get(version)
+        if future is not None:
+            # Shield so a cancelled follower does not cancel the shared load
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.loading[version] = future
+        try:
+            model = await asyncio.to_thread(self.load_func, version)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark as retrieved when nobody else was waiting
+            raise
+        finally:
+            del self.loading[version]
+        model_cache_loads.inc()
+        self.add(model)
+        future.set_result(model)
+        return model
+
+    def add(self, model):
+        """
+        Insert model as the most recently used one and evict others to stay within budget.
+        """
+        self.models[model.version] = model
+        self.models.move_to_end(model.version)
+        unpinned_bytes = sum(cached.nbytes for version, cached in self.models.items() if version not in self.pinned)
+        for version in list(self.models):
+            if unpinned_bytes <= self.max_bytes:
+                break
+            if version in self.pinned or version == model.version:
+                continue
+            unpinned_bytes -= self.models.pop(version).nbytes
+            model_cache_evictions.inc()
+        model_cache_bytes.set(self.nbytes)
+
+    async def preload(self):
+        """
+        Load every pinned version. Failures are reported and skipped.
+        """
+        for version in sorted(self.pinned):
+            try:
+                await self.get(version)
+            except Exception as e:
+                print(f"Error preloading model {version}: {str(e)}")
+
+    def describe(self):
+        """
+        Returns:
+            list of dict: Loaded versions from least to most recently used.
+        """
+        return [{"model_version": version, "bytes": model.nbytes, "pinned": version in self.pinned}
+                for version, model in self.models.items()]
+
+
+class ModelRepository:
+    """
+    The versioned model files of one family in a directory, and the models served from them.
+
+    Holds the selection rules shared by every process that scores: the newest file (by ctime)
+    is the active model, any other version can be requested by its tag and is loaded into a
+    ModelCache, and newer files are swapped in as they appear, unless they were rolled back.
+    The latest model is loaded when the repository is created.
+
+    Args:
+        directory (str): Directory holding the '<base_filename>-v<n>-<date>.joblib' files.
+        base_filename (str): Model family, e.g. 'model_best_lr'.
+        fields (list of str): Scoring field names, in wire order.
+        column_renames (dict): Field name to model column name, for the names that differ.
+        mmap (bool): Memory-map the model arrays read-only.
+        cache_max_bytes (int): Memory budget of the models loaded by version.
+        pinned (iterable of str): Versions preloaded and never evicted from the cache.
+    """
+
+    def __init__(self, directory, base_filename, fields, column_renames, mmap=False, cache_max_bytes=256 * 1024 * 1024,
+                 pinned=()):
+        self.directory = directory
+        self.base_filename = base_filename
+        self.fields = fields
+        self.column_renames = column_renames
+        self.mmap = mmap
+        self.reload_lock = None
+        self.store = ModelStore(self.load(self.latest_path()))
+        self.cache = ModelCache(lambda version: self.load(self.path_for(version)), cache_max_bytes, pinned)
+
+    def latest_path(self):
+        """
+        Path of the newest versioned model file.
+        """
+        search_pattern = f"{self.base_filename}-v*-*.joblib"
+        files = glob.glob(os.path.join(self.directory, search_pattern))
+        if not files:
+            raise FileNotFoundError(f"No model files found with pattern '{search_pattern}'")
+        return max(files, key=os.path.getctime)
+
+    def path_for(self, version):
+        """
+        Path of the model file of a version tag.
+
+        Raises:
+            FileNotFoundError: If there is no such version.
+        """
+        path = os.path.join(self.directory, f"{version}.joblib")
+        if not re.match(MODEL_VERSION_PATTERN, version) or not os.path.isfile(path):
+            raise FileNotFoundError(f"Unknown model version '{version}'")
+        return path
+
+    def available_versions(self):
+        """
+        Version tags of every model file, oldest first.
+        """
+        files = sorted(glob.glob(os.path.join(self.directory, f"{self.base_filename}-v*-*.joblib")),
+                       key=os.path.getctime)
+        return [os.path.splitext(os.path.basename(path))[0] for path in files]
+
+    def load(self, path):
+        """
+        Load, validate and warm up a model file. Blocking, run it off the event loop when serving.
+        """
+        served = ServedModel(path, self.fields, self.column_renames, mmap=self.mmap)
+        served.warm_up()
+        return served
+
+    async def resolve(self, version=None):
+        """
+        Model to score with: the active one, or the requested version.
+
+        Raises:
+            FileNotFoundError: For an unknown version.
+        """
+        served = self.store.active
+        if version is None or version == served.version:
+            return served
+        previous = self.store.previous
+        if previous is not None and previous.version == version:
+            return previous
+        return await self.cache.get(version)
+
+    def lock(self):
+        # Created on first use rather than in __init__, so it belongs to the serving event loop
+        if self.reload_lock is None:
+            self.reload_lock = asyncio.Lock()
+        return self.reload_lock
+
+    async def reload(self, path=None):
+        """
+        Load a model file in a worker thread and swap it in once it is ready.
+
+        Args:
+            path (str): Model file, by default the latest one.
+
+        Returns:
+            bool: True if a new model is now served, False if path is already the active one.
+        """
+        async with self.lock():
+            return await self.swap(path)
+
+    async def swap(self, path=None):
+        """
+        Body of reload(), for callers already holding the reload lock.
+        """
+        if path is None:
+            path = self.latest_path()
+        if path == self.store.active.path:
+            return False
+        try:
+            candidate = await asyncio.to_thread(self.load, path)
+        except Exception:
+            model_reloads.labels(result="failed").inc()
+            raise
+        self.store.activate(candidate)
+        return True
+
+    async def rollback(self):
+        """
+        Serve the previous model again.
+
+        Returns:
+            bool: False if there is no previous model.
+        """
+        async with self.lock():
+            return self.store.rollback()
+
+    async def apply(self, decision):
+        """
+        Follow an admin decision published through a ModelControl by any worker: serve its model
+        and skip its rolled back files from now on.
+
+        Returns:
+            bool: True if a new model is now served.
+        """
+        async with self.lock():
+            self.store.rejected_paths = set(decision['rejected_paths'])
+            path = decision['active_path']
+            previous = self.store.previous
+            if (path != self.store.active.path and previous is not None and previous.path == path
+                    and self.store.active.path in self.store.rejected_paths):
+                return self.store.rollback()
+            return await self.swap(path)
+
+    async def follow(self, control, interval):
+        """
+        Apply the admin decisions other workers publish to control. Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                decision = await asyncio.to_thread(control.read)
+                if decision is not None and decision['id'] != control.applied:
+                    await self.apply(decision)
+                    control.applied = decision['id']
+            except Exception as e:
+                # Retried on the next check, e.g. when the model file cannot be loaded yet
+                print(f"Error applying model admin decision: {str(e)}")
+
+    async def watch(self, interval):
+        """
+        Serve newer model files as they appear, except rolled back ones. Runs until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                latest = self.latest_path()
+                if latest not in self.store.rejected_paths:
+                    await self.reload(latest)
+            except Exception as e:
+                # A file still being written fails to load, it is retried on the next check
+                print(f"Error reloading model: {str(e)}")
+
+
+class ModelControl:
+    """
+    Admin decisions shared by the worker processes of one service, through a JSON file.
+
+    An admin request (reload, rollback) reaches a single worker. That worker publishes the
+    model every worker must serve and the rolled back files, and each worker applies the
+    decision with ModelRepository.apply(): the running ones within a poll interval
+    (ModelRepository.follow), the ones started later at startup. The last decision wins.
+
+    Args:
+        path (str): The control file, in a directory shared by the workers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Id of the last decision this process applied or published
+        self.applied = None
+
+    def read(self):
+        """
+        Returns:
+            dict: The last decision ('id', 'active_path', 'rejected_paths'), None if there was none yet.
+        """
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def publish(self, store):
+        """
+        Record the model store serves and its rolled back files as the decision for every worker.
+        """
+        decision = {'id': uuid.uuid4().hex, 'active_path': store.active.path,
+                    'rejected_paths': sorted(store.rejected_paths)}
+        # Written aside and renamed, so a reader never sees a partial file
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=os.path.dirname(self.path) or '.')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(decision, f)
+        os.replace(tmp_path, self.path)
+        self.applied = decision['id']
+        return decision
@@ -1,22 +1,42 @@
 from datetime import datetime, timedelta, timezone
-from typing import Union, Optional
+from typing import Union, Optional, Literal
 import jwt
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, contextmanager
 from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 from typing_extensions import Annotated
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 import os
+import sys
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncio
+import asyncpg
 import logging
 import httpx
 import json
+import orjson
+import random
+import csv
+import io
+import time
 from prometheus_fastapi_instrumentator import Instrumentator
-from prometheus_client import Summary
+from prometheus_client import Summary, Counter, Gauge, Histogram
+from concurrent.futures import ThreadPoolExecutor
+
+# Adjust sys.path so the 'api' package resolves both when running from code/api and from the project root
+code_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, code_dir)
+
+from api.prediction_client import PredictionServiceClient, CircuitBreaker, CircuitOpenError
+from api.cache import TTLCache, PredictionCache
+from api.prediction_writer import PredictionWriteBuffer
+from api.admission import AdmissionLimiter, AdmissionRejected
+from api.features import (COLUMN_RENAMES, INT_SCORING_FIELDS, SCORING_FIELDS, BatchScoringRequest, CompactBatchScoringRequest,
+                          CompactScoringItem, ScoringItem, format_validation_error)
+from api.model_store import MODEL_VERSION_PATTERN, ModelRepository
 
 
 logging.basicConfig(level=logging.INFO)
@@ -33,9 +53,74 @@ DB_HOST = os.getenv("DB_HOST", "localhost")  # Uses'db' for Docker Compose
 DB_NAME = os.getenv("DB_NAME", "nba_db")
 DB_USER = os.getenv("DB_USER", "ubuntu")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "mlops")
+
+# Connection pool settings, shared by every route of the API
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))  # seconds to wait for a free connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # prepared statements cached per connection
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))  # seconds before a single query is cancelled
+
+# Cache of authenticated user records, so get_current_user does not hit the database on every request
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))  # seconds a cached user record stays valid
+
+# Worker pool for bcrypt hashing and verification, kept off the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))  # pending calls before /login and /signup answer 503
 PREDICTION_SERVICE_HOST = os.getenv('PREDICTION_SERVICE_HOST', 'localhost')
 PREDICTION_SERVICE_PORT = os.getenv('PREDICTION_SERVICE_PORT', '8001')
 
+# HTTP client settings for calls to the prediction service
+PREDICTION_SERVICE_MAX_CONNECTIONS = int(os.getenv("PREDICTION_SERVICE_MAX_CONNECTIONS", "100"))
+PREDICTION_SERVICE_MAX_KEEPALIVE = int(os.getenv("PREDICTION_SERVICE_MAX_KEEPALIVE", "20"))
+PREDICTION_SERVICE_KEEPALIVE_EXPIRY = float(os.getenv("PREDICTION_SERVICE_KEEPALIVE_EXPIRY", "30"))
+PREDICTION_SERVICE_CONNECT_TIMEOUT = float(os.getenv("PREDICTION_SERVICE_CONNECT_TIMEOUT", "1"))
+PREDICTION_SERVICE_READ_TIMEOUT = float(os.getenv("PREDICTION_SERVICE_READ_TIMEOUT", "5"))
+PREDICTION_SERVICE_MAX_RETRIES = int(os.getenv("PREDICTION_SERVICE_MAX_RETRIES", "2"))
+PREDICTION_SERVICE_BACKOFF_BASE = float(os.getenv("PREDICTION_SERVICE_BACKOFF_BASE", "0.05"))
+PREDICTION_SERVICE_BACKOFF_MAX = float(os.getenv("PREDICTION_SERVICE_BACKOFF_MAX", "1"))
+PREDICTION_SERVICE_FAILURE_THRESHOLD = int(os.getenv("PREDICTION_SERVICE_FAILURE_THRESHOLD", "5"))
+PREDICTION_SERVICE_RESET_TIMEOUT = float(os.getenv("PREDICTION_SERVICE_RESET_TIMEOUT", "30"))
+
+# Admission control: per route class, at most MAX_CONCURRENCY requests run at once and up to MAX_QUEUE more
+# wait for ADMISSION_QUEUE_TIMEOUT seconds. Anything beyond that gets a 503 with Retry-After right away.
+ADMISSION_LIMITS = {
+    route_class: (
+        int(os.getenv(f"ADMISSION_{route_class.upper()}_MAX_CONCURRENCY", str(max_concurrency))),
+        int(os.getenv(f"ADMISSION_{route_class.upper()}_MAX_QUEUE", str(max_queue)))
+    )
+    for route_class, max_concurrency, max_queue in [("auth", 8, 32), ("predict", 64, 256), ("verify", 16, 64), ("export", 2, 2)]
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1"))
+ADMISSION_RETRY_AFTER = os.getenv("ADMISSION_RETRY_AFTER", "1")  # seconds, sent in the Retry-After header
+
+# Cache of prediction results for identical scoring payloads, cleared when the served model version changes
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+PREDICTION_CACHE_MAX_SIZE = int(os.getenv("PREDICTION_CACHE_MAX_SIZE", "10000"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "300"))  # seconds
+MODEL_VERSION_POLL_INTERVAL = float(os.getenv("MODEL_VERSION_POLL_INTERVAL", "5"))  # seconds between checks of the served model
+
+# Write-behind mode: predictions are buffered in memory and written in batches by a background task,
+# taking the commit off the request path. Rows still in the buffer are lost if the process is killed.
+PREDICTION_WRITE_BEHIND = os.getenv("PREDICTION_WRITE_BEHIND", "false").lower() == "true"
+PREDICTION_WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("PREDICTION_WRITE_BEHIND_QUEUE_SIZE", "10000"))
+PREDICTION_WRITE_BEHIND_BATCH_SIZE = int(os.getenv("PREDICTION_WRITE_BEHIND_BATCH_SIZE", "500"))
+PREDICTION_WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("PREDICTION_WRITE_BEHIND_FLUSH_INTERVAL", "0.2"))  # seconds
+
+# Embedded inference: the gateway loads the model itself and scores in process, with the same model
+# selection as the prediction service (latest file in trained_models, hot reload, versions on request).
+# The prediction service still answers whenever the embedded model cannot, e.g. it failed to load.
+PREDICTION_EMBEDDED = os.getenv("PREDICTION_EMBEDDED", "false").lower() == "true"
+PREDICTION_EMBEDDED_MODELS_DIR = os.getenv("PREDICTION_EMBEDDED_MODELS_DIR",
+                                           os.path.join(os.path.dirname(code_dir), 'trained_models'))
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))  # seconds between checks for a newer model file
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() == "true"
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "256"))
+
+# Rows fetched per round trip by the /predictions/export cursor, also the number of rows per streamed chunk
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -46,70 +131,297 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+password_hash_queue_depth = Gauge('password_hash_queue_depth', 'Password hash/verify calls queued or running in the worker pool')
+password_hash_rejections = Counter('password_hash_rejections_total', 'Password hash/verify calls rejected because the queue was full')
+password_tasks_pending = 0
+
+
+async def run_in_password_pool(func, *args):
+    """
+    Run a CPU-heavy password function in the bounded password worker pool.
+
+    Raises:
+        HTTPException: 503 if PASSWORD_HASH_MAX_QUEUE calls are already pending.
+    """
+    global password_tasks_pending
+    if password_tasks_pending >= PASSWORD_HASH_MAX_QUEUE:
+        password_hash_rejections.inc()
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Too many login attempts, please retry",
+                            headers={"Retry-After": "1"})
+    password_tasks_pending += 1
+    password_hash_queue_depth.inc()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(app.state.password_executor, func, *args)
+    finally:
+        password_tasks_pending -= 1
+        password_hash_queue_depth.dec()
+
+
 username = "johndoe"
 password = "secret"
 hashed_password = get_password_hash(password)
 disabled = False
 
 
-def get_db_connection():
-    conn = psycopg2.connect(
+async def init_db_connection(conn):
+    """
+    Register JSON codecs so JSONB columns are exchanged as Python objects.
+    """
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def create_db_pool():
+    """
+    Create the asyncpg connection pool shared by all requests.
+
+    Returns:
+        asyncpg.Pool: The connection pool.
+    """
+    return await asyncpg.create_pool(
         host=DB_HOST,
         database=DB_NAME,
         user=DB_USER,
         password=DB_PASSWORD,
-        cursor_factory=RealDictCursor
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        init=init_db_connection
+    )
+
+
+# Key of the advisory lock taken while building the index, so only one gateway process builds it
+UNVERIFIED_INDEX_LOCK_KEY = 7_201_001
+
+
+async def ensure_unverified_index():
+    """
+    Create the partial index over unverified predictions on databases created before init.sql had it.
+
+    Runs in the background on its own connection without command timeout: on a large table the
+    build takes minutes, longer than DB_COMMAND_TIMEOUT, and must not delay startup. A concurrent
+    build that was cancelled leaves an invalid index that IF NOT EXISTS would accept, so an invalid
+    index is dropped and built again.
+    """
+    try:
+        conn = await asyncpg.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASSWORD,
+                                     command_timeout=None)
+    except Exception as e:
+        print(f"Error connecting to build index predictions_unverified_id_idx: {e}")
+        return
+    try:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", UNVERIFIED_INDEX_LOCK_KEY):
+            return  # another gateway process is on it
+        valid = await conn.fetchval("""
+        SELECT i.indisvalid
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = 'predictions_unverified_id_idx'
+        """)
+        if valid:
+            return
+        if valid is False:
+            print("Index predictions_unverified_id_idx is invalid, rebuilding it.")
+            await conn.execute("DROP INDEX CONCURRENTLY IF EXISTS predictions_unverified_id_idx")
+        # CONCURRENTLY does not block writes, but cannot run inside a transaction
+        await conn.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS predictions_unverified_id_idx
+        ON predictions (id) WHERE user_verification IS NULL
+        """)
+        print("Index predictions_unverified_id_idx created.")
+    except Exception as e:
+        print(f"Error building index predictions_unverified_id_idx: {e}")
+    finally:
+        # Closing the session also releases the advisory lock
+        await conn.close()
+
+
+@asynccontextmanager
+async def get_db_connection():
+    """
+    Borrow a connection from the shared pool and give it back afterwards.
+
+    Raises:
+        HTTPException: 503 if no connection becomes free within DB_POOL_ACQUIRE_TIMEOUT.
+    """
+    pool = app.state.db_pool
+    try:
+        conn = await pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database is busy, please retry")
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def create_prediction_client():
+    """
+    Create the keep-alive client used for every call to the prediction service.
+
+    Returns:
+        PredictionServiceClient: The client.
+    """
+    return PredictionServiceClient(
+        base_url=f"http://{PREDICTION_SERVICE_HOST}:{PREDICTION_SERVICE_PORT}",
+        max_connections=PREDICTION_SERVICE_MAX_CONNECTIONS,
+        max_keepalive_connections=PREDICTION_SERVICE_MAX_KEEPALIVE,
+        keepalive_expiry=PREDICTION_SERVICE_KEEPALIVE_EXPIRY,
+        connect_timeout=PREDICTION_SERVICE_CONNECT_TIMEOUT,
+        read_timeout=PREDICTION_SERVICE_READ_TIMEOUT,
+        max_retries=PREDICTION_SERVICE_MAX_RETRIES,
+        backoff_base=PREDICTION_SERVICE_BACKOFF_BASE,
+        backoff_max=PREDICTION_SERVICE_BACKOFF_MAX,
+        breaker=CircuitBreaker(PREDICTION_SERVICE_FAILURE_THRESHOLD, PREDICTION_SERVICE_RESET_TIMEOUT)
     )
-    return conn
+
+
+prediction_cache_lookups = Counter('prediction_cache_lookups_total', 'Prediction cache lookups by outcome', ['result'])
+prediction_cache_evictions = Counter('prediction_cache_evictions_total', 'Prediction results evicted from the cache to make room')
+prediction_cache = PredictionCache(maxsize=PREDICTION_CACHE_MAX_SIZE, ttl=PREDICTION_CACHE_TTL,
+                                   on_evict=lambda key, value: prediction_cache_evictions.inc())
+
+
+# Buckets from 0.5 ms to 2.5 s, most stages of a request take a few milliseconds
+STAGE_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+stage_latency_histogram = Histogram('gateway_stage_seconds', 'Time spent in each stage of an authenticated request',
+                                    ['stage', 'model_version'], buckets=STAGE_LATENCY_BUCKETS)
+
+
+@contextmanager
+def time_stage(stage):
+    """
+    Record the duration of a request stage, labelled with the served model version.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency_histogram.labels(stage=stage, model_version=prediction_cache.model_version or "unknown").observe(
+            time.perf_counter() - start)
+
+
+async def watch_model_version():
+    """
+    Poll the served model version, so cached results of a replaced model are dropped even
+    while every request is served from the cache. With embedded inference that is the model
+    of this process, otherwise the one of the prediction service.
+    """
+    while True:
+        try:
+            if app.state.embedded_models is not None:
+                model_version = app.state.embedded_models.store.active.version
+            else:
+                response = await app.state.prediction_client.get("/model")
+                response.raise_for_status()
+                model_version = response.json().get("model_version")
+            if prediction_cache.set_model_version(model_version):
+                print(f"Served model version is now {prediction_cache.model_version}")
+        except (CircuitOpenError, httpx.HTTPError, ValueError) as e:
+            print(f"Error polling prediction service model version: {e}")
+        await asyncio.sleep(MODEL_VERSION_POLL_INTERVAL)
+
+
+def load_embedded_models():
+    """
+    Load the latest model for embedded inference.
+
+    Returns:
+        ModelRepository: The models, or None if loading failed and the prediction service must answer.
+    """
+    try:
+        models = ModelRepository(PREDICTION_EMBEDDED_MODELS_DIR, 'model_best_lr', SCORING_FIELDS, COLUMN_RENAMES,
+                                 mmap=MODEL_MMAP, cache_max_bytes=int(MODEL_CACHE_MAX_MB * 1024 * 1024))
+    except Exception as e:
+        print(f"Error loading embedded model, predictions go to the prediction service: {e}")
+        return None
+    print(f"Embedded inference with model {models.store.active.version}")
+    return models
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup event
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
+        app.state.db_pool = await create_db_pool()
+        app.state.prediction_client = create_prediction_client()
+        app.state.password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+        # Created here rather than at import, so the semaphores belong to the server's event loop
+        app.state.admission_limiters = {
+            route_class: AdmissionLimiter(route_class, max_concurrency, max_queue, ADMISSION_QUEUE_TIMEOUT)
+            for route_class, (max_concurrency, max_queue) in ADMISSION_LIMITS.items()
+        }
+        if PREDICTION_WRITE_BEHIND:
+            app.state.prediction_writer = PredictionWriteBuffer(
+                save_predictions,
+                max_queue_size=PREDICTION_WRITE_BEHIND_QUEUE_SIZE,
+                batch_size=PREDICTION_WRITE_BEHIND_BATCH_SIZE,
+                flush_interval=PREDICTION_WRITE_BEHIND_FLUSH_INTERVAL
+            )
+            app.state.prediction_writer.start()
+        app.state.embedded_models = None
+        app.state.embedded_model_watcher = None
+        if PREDICTION_EMBEDDED:
+            app.state.embedded_models = await asyncio.to_thread(load_embedded_models)
+            if app.state.embedded_models is not None and MODEL_RELOAD_INTERVAL > 0:
+                app.state.embedded_model_watcher = asyncio.create_task(
+                    app.state.embedded_models.watch(MODEL_RELOAD_INTERVAL))
+        if PREDICTION_CACHE_ENABLED:
+            app.state.model_version_watcher = asyncio.create_task(watch_model_version())
+        async with get_db_connection() as conn:
+            async with conn.transaction():
                 # Check if the username already exists
-                check_query = "SELECT COUNT(*) FROM users WHERE username = %s"
-                cur.execute(check_query, (username,))
-                count = cur.fetchone()['count']
+                check_query = "SELECT COUNT(*) FROM users WHERE username = $1"
+                count = await conn.fetchval(check_query, username)
 
                 if count == 0:
                     # Username doesn't exist, insert the new user
                     insert_query = """
                     INSERT INTO users (username, hashed_password, disabled)
-                    VALUES (%s, %s, %s)
+                    VALUES ($1, $2, $3)
                     """
-                    cur.execute(insert_query, (username, hashed_password, disabled))
+                    await conn.execute(insert_query, username, hashed_password, disabled)
                     print(f"User '{username}' inserted successfully.")
                 else:
                     print(f"User '{username}' already exists.")
 
                 # Check if the predictions table exists
-                cur.execute("""
+                table_exists = await conn.fetchval("""
                 SELECT EXISTS (
                     SELECT FROM information_schema.tables
                     WHERE table_schema = 'public'
                     AND table_name = 'predictions'
                 );
                 """)
-                table_exists = cur.fetchone()['exists']
                 if not table_exists:
                     print("Table 'predictions' does not exist yet.")
                 else:
                     print("Table 'predictions' already exists.")
 
-            conn.commit()
+        # Databases created before the index was added to init.sql get it in the background
+        app.state.index_builder = asyncio.create_task(ensure_unverified_index()) if table_exists else None
     except Exception as e:
         print(f"Error during application startup: {e}")
         raise
 
     yield  # This is where the application runs
 
-    # Shutdown event (if needed)
-    # can add any cleanup code here if necessary
-
-app = FastAPI(lifespan=lifespan)
+    # Shutdown event: write out buffered predictions, then close all pooled connections.
+    # An index build cut short leaves an invalid index, rebuilt on the next startup.
+    if app.state.index_builder is not None:
+        app.state.index_builder.cancel()
+    if PREDICTION_CACHE_ENABLED:
+        app.state.model_version_watcher.cancel()
+    if app.state.embedded_model_watcher is not None:
+        app.state.embedded_model_watcher.cancel()
+    if PREDICTION_WRITE_BEHIND:
+        await app.state.prediction_writer.close()
+    await app.state.prediction_client.aclose()
+    await app.state.db_pool.close()
+    app.state.password_executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 Instrumentator().instrument(app).expose(app)
 
 # Configure CORS so we can communicate with the React frontend app
@@ -147,16 +459,32 @@ class UserInDB(User):
     hashed_password: str
 
 
-def get_user(username: str):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT username, hashed_password, disabled FROM users WHERE username = %s",
-                (username,))
-    user = cur.fetchone()
-    cur.close()
-    conn.close()
+user_cache = TTLCache(maxsize=USER_CACHE_MAX_SIZE, ttl=USER_CACHE_TTL)
+user_cache_hits = Counter('user_cache_hits_total', 'Authenticated user lookups served from the cache')
+user_cache_misses = Counter('user_cache_misses_total', 'Authenticated user lookups that went to the database')
+
+
+def invalidate_user(username: str):
+    """
+    Drop a user from the lookup cache. Call after any change to the users table.
+    """
+    user_cache.invalidate(username)
+
+
+async def get_user(username: str):
+    cached_user = user_cache.get(username)
+    if cached_user is not None:
+        user_cache_hits.inc()
+        return cached_user
+    user_cache_misses.inc()
+
+    async with get_db_connection() as conn:
+        user = await conn.fetchrow("SELECT username, hashed_password, disabled FROM users WHERE username = $1",
+                                   username)
     if user:
-        return UserInDB(**user)
+        user = UserInDB(**dict(user))
+        user_cache.set(username, user)
+        return user
     else:
         return None
 
@@ -165,11 +493,11 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def authenticate_user(username: str, password: str):
-    user = get_user(username)
+async def authenticate_user(username: str, password: str):
+    user = await get_user(username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await run_in_password_pool(verify_password, password, user.hashed_password):
         return False
     return user
 
@@ -192,14 +520,16 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with time_stage("jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
     except InvalidTokenError:
         raise credentials_exception
-    user = get_user(username=token_data.username)
+    with time_stage("user_lookup"):
+        user = await get_user(username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -213,6 +543,20 @@ async def authorize_user(
     return current_user
 
 
+def admit(route_class):
+    """
+    Dependency holding an admission slot of route_class for the duration of the request.
+    """
+    async def admission_slot():
+        try:
+            async with app.state.admission_limiters[route_class].slot():
+                yield
+        except AdmissionRejected:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, please retry",
+                                headers={"Retry-After": ADMISSION_RETRY_AFTER})
+    return admission_slot
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -225,11 +569,15 @@ async def root():
     return {"message": "Welcome to the NBA prediction API!"}
 
 
-@app.post("/login")
+login_time_histogram = Histogram('login_duration_seconds', 'Time taken to authenticate a /login request')
+
+
+@app.post("/login", dependencies=[Depends(admit("auth"))])
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> Token:
-    user = authenticate_user(form_data.username, form_data.password)
+    with login_time_histogram.time():
+        user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -244,100 +592,292 @@ async def login_for_access_token(
 
 
 # Signup endpoint
-@app.post("/signup")
+@app.post("/signup", dependencies=[Depends(admit("auth"))])
 async def signup(user: User):
-    conn = get_db_connection()
-    cur = conn.cursor()
+    hashed_password = await run_in_password_pool(get_password_hash, user.password)
     try:
-        hashed_password = get_password_hash(user.password)
-        cur.execute("INSERT INTO users (username, hashed_password, disabled) VALUES (%s, %s, %s)",
-                    (user.username, hashed_password, user.disabled))
-        conn.commit()
+        async with get_db_connection() as conn:
+            await conn.execute("INSERT INTO users (username, hashed_password, disabled) VALUES ($1, $2, $3)",
+                               user.username, hashed_password, user.disabled)
+        invalidate_user(user.username)
         return {"message": f"User {user.username} created successfully"}
-    except psycopg2.errors.UniqueViolation:
+    except asyncpg.UniqueViolationError:
         raise HTTPException(status_code=400, detail="Username already exists")
-    finally:
-        cur.close()
-        conn.close()
-
-
-class ScoringItem(BaseModel):
-    """
-    Model representing scoring parameters for prediction.
-    """
-    Period: float
-    Minutes_Remaining: float
-    Seconds_Remaining: float
-    Shot_Distance: float
-    X_Location: float
-    Y_Location: float
-    Action_Type_Frequency: float
-    Team_Name_Frequency: float
-    Home_Team_Frequency: float
-    Away_Team_Frequency: float
-    ShotType_2PT_Field_Goal: int
-    ShotType_3PT_Field_Goal: int
-    ShotZoneBasic_Above_the_Break_3: int
-    ShotZoneBasic_Backcourt: int
-    ShotZoneBasic_In_The_Paint_Non_RA: int
-    ShotZoneBasic_Left_Corner_3: int
-    ShotZoneBasic_Mid_Range: int
-    ShotZoneBasic_Restricted_Area: int
-    ShotZoneBasic_Right_Corner_3: int
-    ShotZoneArea_Back_Court_BC: int
-    ShotZoneArea_Center_C: int
-    ShotZoneArea_Left_Side_Center_LC: int
-    ShotZoneArea_Left_Side_L: int
-    ShotZoneArea_Right_Side_Center_RC: int
-    ShotZoneArea_Right_Side_R: int
-    ShotZoneRange_16_24_ft: int
-    ShotZoneRange_24_ft: int
-    ShotZoneRange_8_16_ft: int
-    ShotZoneRange_Back_Court_Shot: int
-    ShotZoneRange_Less_Than_8_ft: int
-    SeasonType_Playoffs: int
-    SeasonType_Regular_Season: int
-    Game_ID_Frequency: float
-    Game_Event_ID_Frequency: float
-    Player_ID_Frequency: float
-    Year: int
-    Month: int
-    Day: int
-    Day_of_Week: int
+
+
+def compact_to_named(values):
+    """
+    Turn compact values back into a ScoringItem dict, as stored in the predictions table.
+    """
+    return {name: int(value) if name in INT_SCORING_FIELDS else value for name, value in zip(SCORING_FIELDS, values)}
+
+
+async def call_prediction_service(path, content, model_version=None):
+    """
+    POST an already encoded JSON body to the prediction service and return the decoded answer.
+
+    Args:
+        path (str): Prediction service route.
+        content (bytes): JSON request body, forwarded as is.
+        model_version (str): Optional model version to score with instead of the active one.
+
+    Raises:
+        HTTPException: 404 for an unknown model version, 503 while the circuit breaker is open,
+        502 for any other upstream failure.
+    """
+    params = {"model_version": model_version} if model_version else None
+    try:
+        with time_stage("upstream_call"):
+            response = await app.state.prediction_client.post(path, content=content, params=params,
+                                                              headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+    except CircuitOpenError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Prediction service unavailable",
+                            headers={"Retry-After": str(int(PREDICTION_SERVICE_RESET_TIMEOUT))})
+    except httpx.HTTPStatusError as e:
+        if model_version and e.response.status_code == status.HTTP_404_NOT_FOUND:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model version '{model_version}'")
+        print(f"Error calling prediction service: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Prediction service error")
+    except httpx.HTTPError as e:
+        print(f"Error calling prediction service: {e}")
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Prediction service error")
+    if not model_version:
+        # Only answers of the active model tell which version the cache should follow
+        prediction_cache.set_model_version(response.headers.get("X-Model-Version"))
+    with time_stage("response_parse"):
+        return orjson.loads(response.content)
+
+
+async def save_predictions(rows):
+    """
+    Persist many (prediction, input_parameters) pairs with a single multi-row INSERT.
+
+    Args:
+        rows (list of tuple): Pairs of prediction value and input parameters dict.
+    """
+    insert_query = """
+    INSERT INTO predictions (prediction, input_parameters)
+    SELECT prediction, input_parameters::jsonb
+    FROM unnest($1::integer[], $2::text[]) AS batch(prediction, input_parameters)
+    """
+    predictions = [prediction for prediction, _ in rows]
+    input_parameters = [json.dumps(parameters) for _, parameters in rows]
+    async with get_db_connection() as conn:
+        await conn.execute(insert_query, predictions, input_parameters)
+
+
+async def store_predictions(rows):
+    """
+    Store predictions, either right away or through the write-behind buffer.
+
+    Args:
+        rows (list of tuple): Pairs of prediction value and input parameters dict.
+    """
+    if PREDICTION_WRITE_BEHIND:
+        await app.state.prediction_writer.submit(rows)
+    else:
+        await save_predictions(rows)
 
 
 inference_time_summary = Summary('inference_time_seconds', 'Time taken for inference')
+batch_inference_time_summary = Summary('batch_inference_time_seconds', 'Time taken for batch inference')
+embedded_fallbacks = Counter('embedded_prediction_fallbacks_total',
+                             'Embedded predictions handed to the prediction service instead')
+
+
+async def score_embedded(items, model_version=None):
+    """
+    Score items in process with the embedded model.
+
+    Args:
+        items (list of dict): Validated ScoringItem dicts.
+        model_version (str): Optional model version to score with instead of the active one.
+
+    Returns:
+        list of dict: One {"prediction": ...} per item, in the prediction service's format, or None
+        if embedded inference is off or failed and the prediction service has to answer.
+    """
+    models = getattr(app.state, "embedded_models", None)
+    if models is None:
+        return None
+    try:
+        served = await models.resolve(model_version)
+        with time_stage("embedded_predict"):
+            features = served.layout.from_values([[item[name] for name in SCORING_FIELDS] for item in items])
+            yhat = served.predict(features)
+    except Exception as e:
+        # Also unknown versions: the prediction service may have model files this process does not
+        embedded_fallbacks.inc()
+        print(f"Error in embedded prediction, using the prediction service: {e}")
+        return None
+    if not model_version:
+        prediction_cache.set_model_version(served.version)
+    return [{"prediction": int(value)} for value in yhat]
+
+
+async def predict_item(path, content, payload, model_version=None):
+    """
+    Score one item in process when embedded inference is on, otherwise with the prediction service.
+    """
+    results = await score_embedded([payload], model_version)
+    if results is not None:
+        return results[0]
+    return await call_prediction_service(path, content, model_version)
+
+
+async def predict_and_store(path, content, payload, model_version=None):
+    """
+    Score one item, through the prediction cache when enabled, and store the prediction.
+
+    Args:
+        path (str): Prediction service route matching the format of content.
+        content (bytes): Validated request body, forwarded to the prediction service without re-encoding.
+        payload (dict): The item as a ScoringItem dict, used as cache key and stored with the prediction.
+        model_version (str): Optional model version to score with. Such requests bypass the cache,
+            which only holds results of the active model.
+    """
+    if PREDICTION_CACHE_ENABLED and not model_version:
+        result, outcome = await prediction_cache.get_or_fetch(payload, lambda: predict_item(path, content, payload))
+        prediction_cache_lookups.labels(result=outcome).inc()
+    else:
+        result = await predict_item(path, content, payload, model_version)
+
+    # Save prediction and input parameters to database
+    try:
+        with time_stage("persist"):
+            await store_predictions([(result["prediction"], payload)])
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error saving prediction: {e}")
+        raise HTTPException(status_code=500, detail="Error saving prediction")
+
+    return result
+
+
+async def store_batch_results(results, indices, items, outcomes):
+    """
+    Put upstream batch outcomes at their input positions and store the successful ones in one write.
+    """
+    rows = []
+    for index, item, outcome in zip(indices, items, outcomes):
+        results[index] = outcome
+        if "prediction" in outcome:
+            rows.append((outcome["prediction"], item))
+
+    # Save all predictions and their input parameters in one statement
+    if rows:
+        try:
+            with time_stage("persist"):
+                await store_predictions(rows)
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"Error saving predictions: {e}")
+            raise HTTPException(status_code=500, detail="Error saving predictions")
 
 
-@app.post('/predict', name="Secure prediction based on scoring parameters.")
+@app.post('/predict', name="Secure prediction based on scoring parameters.",
+          dependencies=[Depends(admit("predict"))])
 async def predict(
     current_user: Annotated[User, Depends(authorize_user)],
-    item: ScoringItem
+    item: ScoringItem,
+    request: Request,
+    model_version: Annotated[Optional[str], Query(pattern=MODEL_VERSION_PATTERN)] = None
 ):
     with inference_time_summary.time():
-        url = f"http://{PREDICTION_SERVICE_HOST}:{PREDICTION_SERVICE_PORT}/predict"
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=item.dict())
-            result = response.json()
-
-        # Save prediction and input parameters to database
-        conn = get_db_connection()
-        cur = conn.cursor()
-        try:
-            insert_query = """
-            INSERT INTO predictions (prediction, input_parameters)
-            VALUES (%s, %s)
-            """
-            cur.execute(insert_query, (result["prediction"], json.dumps(item.dict())))
-            conn.commit()
-        except Exception as e:
-            print(f"Error saving prediction: {e}")
-            raise HTTPException(status_code=500, detail="Error saving prediction")
-        finally:
-            cur.close()
-            conn.close()
+        # The body was validated as a ScoringItem, forward the original bytes instead of re-encoding them
+        return await predict_and_store("/predict", await request.body(), item.dict(), model_version)
+
+
+@app.post('/predict/compact', name="Secure prediction based on compact scoring parameters.",
+          dependencies=[Depends(admit("predict"))])
+async def predict_compact(
+    current_user: Annotated[User, Depends(authorize_user)],
+    item: CompactScoringItem,
+    request: Request,
+    model_version: Annotated[Optional[str], Query(pattern=MODEL_VERSION_PATTERN)] = None
+):
+    """
+    Same as /predict, with the scoring parameters sent as a positional array.
+
+    Body:
+        {"schema_version": 1, "values": [...]} with the values in ScoringItem field order.
+    """
+    with inference_time_summary.time():
+        return await predict_and_store("/predict/compact", await request.body(), compact_to_named(item.values),
+                                       model_version)
+
 
-            return response.json()
+@app.post('/predict/batch', name="Secure batch prediction based on scoring parameters.",
+          dependencies=[Depends(admit("predict"))])
+async def predict_batch(
+    current_user: Annotated[User, Depends(authorize_user)],
+    batch: BatchScoringRequest,
+    model_version: Annotated[Optional[str], Query(pattern=MODEL_VERSION_PATTERN)] = None
+):
+    """
+    Score many items with one model call, in process or by the prediction service, and store them with one write.
+
+    Returns:
+        dict: 'predictions', one entry per input item in input order. Each entry holds
+        either a 'prediction' or an 'error' describing why the item was rejected.
+    """
+    with batch_inference_time_summary.time():
+        results = [None] * len(batch.items)
+        valid_indices = []
+        valid_items = []
+        for index, raw_item in enumerate(batch.items):
+            try:
+                valid_items.append(ScoringItem.model_validate(raw_item).dict())
+                valid_indices.append(index)
+            except ValidationError as e:
+                results[index] = {"error": format_validation_error(e)}
+
+        if not valid_items:
+            return {"predictions": results}
+
+        outcomes = await score_embedded(valid_items, model_version)
+        if outcomes is None:
+            upstream = await call_prediction_service("/predict/batch", orjson.dumps({"items": valid_items}),
+                                                     model_version)
+            outcomes = upstream["predictions"]
+        await store_batch_results(results, valid_indices, valid_items, outcomes)
+
+        return {"predictions": results}
+
+
+@app.post('/predict/batch/compact', name="Secure batch prediction based on compact scoring parameters.",
+          dependencies=[Depends(admit("predict"))])
+async def predict_batch_compact(
+    current_user: Annotated[User, Depends(authorize_user)],
+    batch: CompactBatchScoringRequest,
+    request: Request,
+    model_version: Annotated[Optional[str], Query(pattern=MODEL_VERSION_PATTERN)] = None
+):
+    """
+    Same as /predict/batch, with every item sent as a positional array.
+
+    Body:
+        {"schema_version": 1, "rows": [[...], ...]} with each row in ScoringItem field order.
+    """
+    with batch_inference_time_summary.time():
+        if any(len(row) != len(SCORING_FIELDS) for row in batch.rows):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail=f"Every row must have {len(SCORING_FIELDS)} values")
+        if not batch.rows:
+            return {"predictions": []}
+
+        items = [compact_to_named(row) for row in batch.rows]
+        outcomes = await score_embedded(items, model_version)
+        if outcomes is None:
+            upstream = await call_prediction_service("/predict/batch/compact", await request.body(), model_version)
+            outcomes = upstream["predictions"]
+        results = [None] * len(batch.rows)
+        await store_batch_results(results, range(len(batch.rows)), items, outcomes)
+
+        return {"predictions": results}
 
 
 class VerificationInput(BaseModel):
@@ -345,22 +885,49 @@ class VerificationInput(BaseModel):
     true_value: int
 
 
-@app.get("/verify_random_prediction")
+async def sample_unverified_prediction(conn):
+    """
+    Pick a random unverified prediction in constant time.
+
+    Instead of sorting every unverified row with ORDER BY RANDOM(), draw a random id between
+    the smallest and largest unverified id and take the first unverified row at or after it.
+    All lookups are served by the partial index predictions_unverified_id_idx. Rows that
+    follow a long run of verified ids are picked somewhat more often, which is fine for
+    spot-checking.
+
+    Returns:
+        Record or None: The sampled prediction, or None if every prediction is verified.
+    """
+    bounds = await conn.fetchrow("""
+        SELECT min(id) AS low, max(id) AS high
+        FROM predictions
+        WHERE user_verification IS NULL
+    """)
+    if bounds['low'] is None:
+        return None
+
+    sample_query = """
+        SELECT id, prediction, input_parameters, timestamp
+        FROM predictions
+        WHERE user_verification IS NULL AND id >= $1
+        ORDER BY id
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    """
+    prediction = await conn.fetchrow(sample_query, random.randint(bounds['low'], bounds['high']))
+    if prediction is None:
+        # Every row after the probe is locked by another request, wrap around to the start
+        prediction = await conn.fetchrow(sample_query, bounds['low'])
+    return prediction
+
+
+@app.get("/verify_random_prediction", dependencies=[Depends(admit("verify"))])
 async def get_random_prediction(
     current_user: Annotated[User, Depends(authorize_user)],
 ):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
     try:
-        cur.execute("""
-            SELECT id, prediction, input_parameters, timestamp
-            FROM predictions
-            WHERE user_verification IS NULL
-            ORDER BY RANDOM()
-            LIMIT 1
-            FOR UPDATE SKIP LOCKED
-        """)
-        prediction = cur.fetchone()
+        async with get_db_connection() as conn:
+            prediction = await sample_unverified_prediction(conn)
 
         if not prediction:
             return {"message": "No unverified predictions available"}
@@ -374,38 +941,137 @@ async def get_random_prediction(
         }
 
         return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
 
 
-@app.post("/verify_random_prediction")
+@app.post("/verify_random_prediction", dependencies=[Depends(admit("verify"))])
 async def verify_prediction(
     current_user: Annotated[User, Depends(authorize_user)],
     verification: VerificationInput
 ):
     # add check to make sure prediction id is available
-    conn = get_db_connection()
-    cur = conn.cursor()
     try:
-        cur.execute("SELECT * FROM predictions WHERE id = %s", (verification.prediction_id,))
-        prediction = cur.fetchone()
+        async with get_db_connection() as conn:
+            async with conn.transaction():
+                prediction = await conn.fetchrow("SELECT id FROM predictions WHERE id = $1", verification.prediction_id)
 
-        if not prediction:
-            raise HTTPException(status_code=404, detail="Prediction not found")
+                if not prediction:
+                    raise HTTPException(status_code=404, detail="Prediction not found")
 
-        cur.execute(
-            "UPDATE predictions SET user_verification = %s WHERE id = %s",
-            (verification.true_value, verification.prediction_id)
-        )
-        conn.commit()
+                await conn.execute(
+                    "UPDATE predictions SET user_verification = $1 WHERE id = $2",
+                    verification.true_value, verification.prediction_id
+                )
 
         return {"message": f"Prediction_id:{verification.prediction_id} verified successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        cur.close()
-        conn.close()
+
+
+EXPORT_COLUMNS = ["id", "prediction", "user_verification", "timestamp", "input_parameters"]
+
+
+def build_export_query(start, end, verified):
+    """
+    Build the SELECT for /predictions/export from the optional filters.
+
+    Returns:
+        tuple: The query string and its positional arguments.
+    """
+    conditions = []
+    args = []
+    if start is not None:
+        args.append(start)
+        conditions.append(f"timestamp >= ${len(args)}")
+    if end is not None:
+        args.append(end)
+        conditions.append(f"timestamp < ${len(args)}")
+    if verified is True:
+        conditions.append("user_verification IS NOT NULL")
+    elif verified is False:
+        conditions.append("user_verification IS NULL")
+    where_clause = " AND ".join(conditions) if conditions else "TRUE"
+    query = f"""
+        SELECT id, prediction, user_verification, timestamp, input_parameters
+        FROM predictions
+        WHERE {where_clause}
+        ORDER BY id
+    """
+    return query, args
+
+
+async def stream_predictions_export(query, args, export_format):
+    """
+    Stream the rows of query through a server-side cursor, EXPORT_FETCH_SIZE rows at a time.
+
+    The first value yielded is empty and only signals that a connection was acquired,
+    so the caller can still answer 503 before the response starts. An export holds its
+    connection until the stream ends, so exports have their own admission class: slow
+    export clients cannot take the whole pool from the other routes.
+    """
+    async with app.state.admission_limiters["export"].slot():
+        async with get_db_connection() as conn:
+            async with conn.transaction(readonly=True):
+                yield b""
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                if export_format == "csv":
+                    writer.writerow(EXPORT_COLUMNS)
+                rows_in_buffer = 0
+                async for record in conn.cursor(query, *args, prefetch=EXPORT_FETCH_SIZE):
+                    if export_format == "csv":
+                        writer.writerow([record['id'], record['prediction'], record['user_verification'],
+                                         record['timestamp'].isoformat(), json.dumps(record['input_parameters'])])
+                    else:
+                        row = dict(record)
+                        row['timestamp'] = row['timestamp'].isoformat()
+                        buffer.write(json.dumps(row) + "\n")
+                    rows_in_buffer += 1
+                    if rows_in_buffer >= EXPORT_FETCH_SIZE:
+                        yield buffer.getvalue().encode()
+                        buffer.seek(0)
+                        buffer.truncate(0)
+                        rows_in_buffer = 0
+                if buffer.tell():
+                    yield buffer.getvalue().encode()
+
+
+@app.get("/predictions/export")
+async def export_predictions(
+    current_user: Annotated[User, Depends(authorize_user)],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    verified: Optional[bool] = None,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+):
+    """
+    Export stored predictions with their input parameters and user verification.
+
+    Args:
+        start (datetime, optional): Only rows with timestamp >= start.
+        end (datetime, optional): Only rows with timestamp < end.
+        verified (bool, optional): True for verified rows only, False for unverified rows only.
+        format (str): 'ndjson' (default) or 'csv'.
+
+    Returns:
+        StreamingResponse: The rows ordered by id. Memory use does not depend on the row count.
+    """
+    # The timestamp column has no time zone, compare in UTC
+    start, end = [value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None and value.tzinfo else value
+                  for value in (start, end)]
+    query, args = build_export_query(start, end, verified)
+    stream = stream_predictions_export(query, args, export_format)
+    try:
+        await stream.__anext__()
+    except AdmissionRejected:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Server is busy, please retry",
+                            headers={"Retry-After": ADMISSION_RETRY_AFTER})
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": f"attachment; filename=predictions.{export_format}"}
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
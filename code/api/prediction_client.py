@@ -0,0 +1,138 @@
+import asyncio
+import random
+import time
+import httpx
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Simple consecutive-failure circuit breaker.
+
+    After `failure_threshold` failed calls in a row the circuit opens and every call is
+    rejected for `reset_timeout` seconds. Afterwards a single trial call is let through
+    (half-open): success closes the circuit again, failure re-opens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.state = self.CLOSED
+
+    def allow_request(self):
+        """
+        Check whether a call may be attempted right now.
+
+        Returns:
+            bool: True if the call may proceed, False if it should fail fast.
+        """
+        if self.state == self.CLOSED:
+            return True
+        # While open or half-open, let one trial call through per reset_timeout window,
+        # so a trial call that never reports back cannot keep the circuit stuck.
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class PredictionServiceClient:
+    """
+    Long-lived HTTP client for the prediction service.
+
+    Keeps one keep-alive connection pool for the whole process, applies per-request
+    timeouts, retries transport errors and 5xx answers with jittered exponential backoff,
+    and fails fast through a circuit breaker while the service is unhealthy.
+    """
+
+    def __init__(self, base_url, max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0,
+                 connect_timeout=1.0, read_timeout=5.0, max_retries=2, backoff_base=0.05, backoff_max=1.0,
+                 breaker=None, transport=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            transport=transport
+        )
+
+    def backoff_delay(self, attempt):
+        """
+        Full-jitter exponential backoff delay for the given retry attempt.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def request(self, method, path, **kwargs):
+        """
+        Call the prediction service with retries and circuit breaking.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path relative to the service base URL.
+            **kwargs: Passed through to httpx.AsyncClient.request.
+
+        Returns:
+            httpx.Response: The first response that is not a server error.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker rejects the call.
+            httpx.HTTPError: If every attempt failed.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("Prediction service circuit is open")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, path, **kwargs)
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                error = httpx.HTTPStatusError(
+                    f"Prediction service answered {response.status_code}", request=response.request, response=response
+                )
+            except httpx.TransportError as e:
+                error = e
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff_delay(attempt))
+
+        self.breaker.record_failure()
+        raise error
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
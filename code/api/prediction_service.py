@@ -1,9 +1,29 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-import pandas as pd
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ValidationError
+from typing import Optional
+import asyncio
+import hmac
 import os
-from joblib import load
-import glob
+import sys
+import time
+import warnings
+from contextlib import asynccontextmanager, contextmanager
+from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_client import Gauge, Histogram
+
+# Adjust sys.path to include the 'code' directory
+code_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, code_dir)
+
+from api.features import (COLUMN_RENAMES, SCORING_FIELDS, BatchScoringRequest, CompactBatchScoringRequest,
+                          CompactScoringItem, ScoringItem, format_validation_error)
+from api.micro_batcher import MicroBatcher
+from api.model_store import MODEL_VERSION_PATTERN, ModelControl, ModelRepository
+from api.shadow import ShadowScorer
+
+# Fallback for process_start_time() where /proc is not available
+module_imported_at = time.time()
 
 # Get the path to the project root directory
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -11,141 +31,485 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..
 # Construct the path to the 'trained_models' directory
 trained_models_dir = os.path.join(project_root, 'trained_models')
 
+# Specify the base filename of the trained model
+base_joblib_filename = 'model_best_lr'
+
+# Opt-in micro-batching of concurrent single-item predictions: up to MAX_SIZE requests, gathered
+# for at most MAX_WAIT_MS after the first one, are scored in one model call
+PREDICT_MICRO_BATCH = os.getenv("PREDICT_MICRO_BATCH", "false").lower() == "true"
+PREDICT_MICRO_BATCH_MAX_SIZE = int(os.getenv("PREDICT_MICRO_BATCH_MAX_SIZE", "64"))
+PREDICT_MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("PREDICT_MICRO_BATCH_MAX_WAIT_MS", "2"))
+
+# Seconds between checks for a newer model file in trained_models, 0 disables the watcher
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "30"))
+
+# Seconds between attempts to load a model during startup while none can be loaded, e.g. trained_models is empty
+MODEL_LOAD_RETRY_INTERVAL = float(os.getenv("MODEL_LOAD_RETRY_INTERVAL", "5"))
+
+# Memory-map model arrays read-only instead of copying them into each process (set by serve.py)
+MODEL_MMAP = os.getenv("MODEL_MMAP", "false").lower() == "true"
+
+# Models requested by version (?model_version=...) are kept in an LRU bounded by their estimated memory.
+# Pinned versions are loaded at startup and never evicted.
+MODEL_CACHE_MAX_MB = float(os.getenv("MODEL_CACHE_MAX_MB", "256"))
+MODEL_PINNED_VERSIONS = [version for version in os.getenv("MODEL_PINNED_VERSIONS", "").split(",") if version]
+
+# Shadow mode: a sample of the requests answered by the active (champion) model is also scored,
+# in the background, by these challenger versions. They are pinned in the model cache.
+SHADOW_MODEL_VERSIONS = [version for version in os.getenv("SHADOW_MODEL_VERSIONS", "").split(",") if version]
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "1000"))
+SHADOW_LOG_FILE = os.getenv("SHADOW_LOG_FILE")  # JSON lines log of disagreements, off when unset
+
+# File through which the workers of serve.py share admin decisions (reload, rollback), so that one
+# reaching a single worker is applied by all of them. Set by serve.py when it runs several workers.
+MODEL_CONTROL_FILE = os.getenv("MODEL_CONTROL_FILE")
+MODEL_CONTROL_POLL_INTERVAL = float(os.getenv("MODEL_CONTROL_POLL_INTERVAL", "1"))  # seconds
+
+# Bearer token of the admin endpoints that change the served model (/model/reload, /model/rollback).
+# They are disabled when unset.
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN")
+
+
+def score_batch(served, features):
+    with time_stage("model_predict", served.version):
+        return served.predict(features)
+
+
+def score_with_active_model(features):
+    """
+    Score a matrix with the model active right now. Used by the micro-batcher, so every
+    prediction carries the version that produced it.
+    """
+    served = models.store.active
+    return [(int(value), served.version) for value in score_batch(served, features)]
+
 
-def find_latest_versioned_model(base_filename):
+def load_models():
     """
-    Find the latest versioned model file based on base_filename.
-    Returns the path to the latest versioned model file.
+    Load and warm up the latest model, once. Blocking.
+
+    Called by the startup phase, or by serve.py before forking so that the workers share the model.
+
+    Raises:
+        FileNotFoundError: If trained_models holds no model file.
     """
-    search_pattern = f"{base_filename}-v*-*.joblib"
-    files = glob.glob(os.path.join(trained_models_dir, search_pattern))
+    global models
+    if models is None:
+        start = time.perf_counter()
+        models = ModelRepository(trained_models_dir, base_joblib_filename, SCORING_FIELDS, COLUMN_RENAMES,
+                                 mmap=MODEL_MMAP, cache_max_bytes=int(MODEL_CACHE_MAX_MB * 1024 * 1024),
+                                 pinned=MODEL_PINNED_VERSIONS + SHADOW_MODEL_VERSIONS)
+        print(f"Loaded model from {models.store.active.path} in {time.perf_counter() - start:.2f}s")
+    return models
 
-    if not files:
-        raise FileNotFoundError(f"No model files found with pattern '{search_pattern}'")
 
-    latest_file = max(files, key=os.path.getctime)
-    return latest_file
+def process_start_time():
+    """
+    Unix time this process started, from /proc on Linux, otherwise the time this module was imported.
+    """
+    try:
+        with open('/proc/self/stat') as f:
+            # starttime is field 22, in clock ticks since boot. Fields are counted after the
+            # command name, which is in parentheses and may contain spaces.
+            start_ticks = float(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat') as f:
+            boot_time = next(float(line.split()[1]) for line in f if line.startswith('btime'))
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration):
+        return module_imported_at
 
 
-# Specify the base filename of the trained model
-base_joblib_filename = 'model_best_lr'
+async def start_serving(app):
+    """
+    Startup phase: load the model, then start the background tasks and report ready.
+
+    Loading is retried until it succeeds. Meanwhile the process is live (/healthz) but not
+    ready (/readyz) and prediction requests are answered with 503.
+    """
+    while True:
+        try:
+            await asyncio.to_thread(load_models)
+            break
+        except Exception as e:
+            print(f"Error loading model, retrying in {MODEL_LOAD_RETRY_INTERVAL}s: {str(e)}")
+            await asyncio.sleep(MODEL_LOAD_RETRY_INTERVAL)
+    await models.cache.preload()
+    if model_control is not None:
+        # A worker started after an admin decision, e.g. replacing one that died, follows it too
+        decision = model_control.read()
+        if decision is not None:
+            try:
+                await models.apply(decision)
+                model_control.applied = decision['id']
+            except Exception as e:
+                print(f"Error applying model admin decision: {str(e)}")
+        app.state.model_control_follower = asyncio.create_task(
+            models.follow(model_control, MODEL_CONTROL_POLL_INTERVAL))
+    if SHADOW_MODEL_VERSIONS:
+        app.state.shadow_scorer = ShadowScorer(models.cache.get, SHADOW_MODEL_VERSIONS, sample_rate=SHADOW_SAMPLE_RATE,
+                                               max_queue_size=SHADOW_QUEUE_SIZE, log_path=SHADOW_LOG_FILE)
+        app.state.shadow_scorer.start()
+    if MODEL_RELOAD_INTERVAL > 0:
+        app.state.model_watcher = asyncio.create_task(models.watch(MODEL_RELOAD_INTERVAL))
+    app.state.ready = True
+    time_to_ready = time.time() - process_start_time()
+    time_to_ready_gauge.set(time_to_ready)
+    print(f"Ready to serve model {models.store.active.version}, {time_to_ready:.2f}s after process start")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.shadow_scorer = None
+    app.state.model_watcher = None
+    app.state.model_control_follower = None
+    # Created here rather than at import, so the queue belongs to the server's event loop
+    app.state.micro_batcher = None
+    if PREDICT_MICRO_BATCH:
+        app.state.micro_batcher = MicroBatcher(score_with_active_model, max_batch_size=PREDICT_MICRO_BATCH_MAX_SIZE,
+                                               max_wait=PREDICT_MICRO_BATCH_MAX_WAIT_MS / 1000)
+        app.state.micro_batcher.start()
+    startup = None
+    if models is not None:
+        # Loaded before forking (serve.py), be ready before accepting the first connection
+        await start_serving(app)
+    else:
+        # Load in the background, so liveness is answered while the model loads
+        startup = asyncio.create_task(start_serving(app))
+    yield
+    if startup is not None:
+        startup.cancel()
+    if app.state.model_watcher is not None:
+        app.state.model_watcher.cancel()
+    if app.state.model_control_follower is not None:
+        app.state.model_control_follower.cancel()
+    if app.state.micro_batcher is not None:
+        await app.state.micro_batcher.close()
+    if app.state.shadow_scorer is not None:
+        await app.state.shadow_scorer.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+Instrumentator().instrument(app).expose(app)
+
+# Buckets from 50 µs to 0.5 s, scoring one item takes well under a millisecond
+STAGE_LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+stage_latency_histogram = Histogram('prediction_stage_seconds', 'Time spent in each stage of a prediction',
+                                    ['stage', 'model_version'], buckets=STAGE_LATENCY_BUCKETS)
+# livemax: with several worker processes, the slowest live one (the serve.py parent never serves and stays at 0)
+time_to_ready_gauge = Gauge('prediction_service_time_to_ready_seconds',
+                            'Seconds from process start until the service was ready to serve predictions',
+                            multiprocess_mode='livemax')
 
-# Load the latest versioned model file
-try:
-    joblib_file_path = find_latest_versioned_model(base_joblib_filename)
-    model = load(joblib_file_path)
-    print(f"Loaded model from {joblib_file_path}")
-except Exception as e:
-    print(f"Error loading model: {str(e)}")
-    model = None
-
-# Load the joblib file
-model = load(joblib_file_path)
-
-app = FastAPI()
-
-
-class ScoringItem(BaseModel):
-    """
-    Model representing scoring parameters for prediction.
-    """
-    Period: float
-    Minutes_Remaining: float
-    Seconds_Remaining: float
-    Shot_Distance: float
-    X_Location: float
-    Y_Location: float
-    Action_Type_Frequency: float
-    Team_Name_Frequency: float
-    Home_Team_Frequency: float
-    Away_Team_Frequency: float
-    ShotType_2PT_Field_Goal: int
-    ShotType_3PT_Field_Goal: int
-    ShotZoneBasic_Above_the_Break_3: int
-    ShotZoneBasic_Backcourt: int
-    ShotZoneBasic_In_The_Paint_Non_RA: int
-    ShotZoneBasic_Left_Corner_3: int
-    ShotZoneBasic_Mid_Range: int
-    ShotZoneBasic_Restricted_Area: int
-    ShotZoneBasic_Right_Corner_3: int
-    ShotZoneArea_Back_Court_BC: int
-    ShotZoneArea_Center_C: int
-    ShotZoneArea_Left_Side_Center_LC: int
-    ShotZoneArea_Left_Side_L: int
-    ShotZoneArea_Right_Side_Center_RC: int
-    ShotZoneArea_Right_Side_R: int
-    ShotZoneRange_16_24_ft: int
-    ShotZoneRange_24_ft: int
-    ShotZoneRange_8_16_ft: int
-    ShotZoneRange_Back_Court_Shot: int
-    ShotZoneRange_Less_Than_8_ft: int
-    SeasonType_Playoffs: int
-    SeasonType_Regular_Season: int
-    Game_ID_Frequency: float
-    Game_Event_ID_Frequency: float
-    Player_ID_Frequency: float
-    Year: int
-    Month: int
-    Day: int
-    Day_of_Week: int
+
+@contextmanager
+def time_stage(stage, model_version):
+    """
+    Record the duration of a prediction stage, labelled with the model version serving the request.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_latency_histogram.labels(stage=stage, model_version=model_version).observe(time.perf_counter() - start)
+
+
+# The model is fed plain arrays whose column order is checked against feature_names_in_
+# once at load (see FeatureLayout), so sklearn's per-call warning about missing names is moot
+warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+
+
+# The served models, set by load_models() during startup. Requests read models.store.active once
+# and use that model throughout, so a hot reload never mixes two versions within one response.
+models = None
+model_control = ModelControl(MODEL_CONTROL_FILE) if MODEL_CONTROL_FILE else None
+
+
+async def publish_admin_decision(models):
+    """
+    Make every worker serve the model this one serves after an admin request, see ModelControl.
+    """
+    if model_control is not None:
+        await asyncio.to_thread(model_control.publish, models.store)
+
+
+def loaded_models():
+    """
+    Raises:
+        HTTPException: 503 until the startup phase has loaded a model.
+    """
+    if models is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Model not loaded yet",
+                            headers={"Retry-After": str(max(1, int(MODEL_LOAD_RETRY_INTERVAL)))})
+    return models
+
+
+async def resolve_model(model_version):
+    """
+    Model serving a request: the active one, or the requested version.
+
+    Raises:
+        HTTPException: 404 for an unknown version, 500 if it fails to load, 503 during startup.
+    """
+    models = loaded_models()
+    try:
+        return await models.resolve(model_version)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown model version '{model_version}'")
+    except Exception as e:
+        print(f"Error loading model {model_version}: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error loading model")
+
+
+async def predict_one(served, features):
+    """
+    Score a single feature row, through the micro-batcher when it is enabled and served is the active model.
+
+    Returns:
+        tuple: The prediction and the version of the model that made it.
+    """
+    # No batcher either when disabled or when the app is served without its lifespan
+    micro_batcher = getattr(app.state, "micro_batcher", None)
+    if micro_batcher is not None and served is models.store.active:
+        with time_stage("micro_batch", served.version):
+            return await micro_batcher.submit(features)
+    return int(score_batch(served, features).item()), served.version
+
+
+def offer_to_shadow(served, features, predictions):
+    """
+    Hand an answered request to the shadow scorer, if shadow mode is on and served is the champion.
+    """
+    shadow_scorer = getattr(app.state, "shadow_scorer", None)
+    if shadow_scorer is not None and served is models.store.active:
+        shadow_scorer.offer(served, features, predictions)
+
+
+def require_admin_token(authorization: Optional[str] = Header(None)):
+    """
+    Dependency of the admin endpoints: the request must carry 'Authorization: Bearer <MODEL_ADMIN_TOKEN>'.
+
+    Raises:
+        HTTPException: 403 if no admin token is configured, 401 if the token is missing or wrong.
+    """
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin endpoints are disabled")
+    if authorization is None or not hmac.compare_digest(authorization.encode(), f"Bearer {MODEL_ADMIN_TOKEN}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid admin token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+class ReloadRequest(BaseModel):
+    """
+    Model file to load; the latest versioned one when omitted.
+    """
+    path: Optional[str] = None
+
+
+@app.get('/healthz')
+async def healthz():
+    """
+    Liveness endpoint: the process is up and its event loop responds, model loaded or not.
+    """
+    return {"status": "ok"}
+
+
+@app.get('/readyz')
+async def readyz(response: Response):
+    """
+    Readiness endpoint: 200 once the model is loaded and warmed up, 503 before.
+    """
+    if not getattr(app.state, "ready", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+    return {"status": "ready", "model_version": models.store.active.version}
+
+
+@app.get('/model')
+async def get_model():
+    """
+    Endpoint describing the model currently served.
+
+    Returns:
+        dict: The active model version tag and the one kept for rollback, if any.
+    """
+    store = loaded_models().store
+    return {"model_version": store.active.version,
+            "previous_model_version": store.previous.version if store.previous else None}
+
+
+@app.get('/models')
+async def get_models():
+    """
+    Endpoint listing the models this process holds and the versions that can be requested.
+
+    Returns:
+        dict: Active and previous version, the versions loaded on demand (least recently
+        used first) and every version available in trained_models.
+    """
+    models = loaded_models()
+    previous = models.store.previous
+    return {"model_version": models.store.active.version,
+            "previous_model_version": previous.version if previous else None,
+            "loaded": models.cache.describe(),
+            "loaded_bytes": models.cache.nbytes,
+            "max_bytes": models.cache.max_bytes,
+            "available": models.available_versions()}
+
+
+@app.post('/model/reload', dependencies=[Depends(require_admin_token)])
+async def post_model_reload(request: Optional[ReloadRequest] = None):
+    """
+    Admin endpoint loading a model file and swapping it in without dropping requests.
+    Requires the admin token, see require_admin_token.
+    With several workers (serve.py), every worker follows within MODEL_CONTROL_POLL_INTERVAL.
+
+    Args:
+        request (ReloadRequest): Optional model file path, relative to trained_models.
+
+    Returns:
+        dict: Whether the model changed and the version now served.
+    """
+    models = loaded_models()
+    path = None
+    if request is not None and request.path:
+        path = os.path.abspath(os.path.join(models.directory, request.path))
+        if os.path.dirname(path) != models.directory or not os.path.isfile(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Model file not found")
+        models.store.rejected_paths.discard(path)
+    try:
+        reloaded = await models.reload(path)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error loading model: {str(e)}")
+    await publish_admin_decision(models)
+    return {"reloaded": reloaded, "model_version": models.store.active.version}
+
+
+@app.post('/model/rollback', dependencies=[Depends(require_admin_token)])
+async def post_model_rollback():
+    """
+    Admin endpoint serving the previous model again.
+    Requires the admin token, see require_admin_token.
+    With several workers (serve.py), every worker follows within MODEL_CONTROL_POLL_INTERVAL.
+
+    Returns:
+        dict: The version now served.
+    """
+    models = loaded_models()
+    if not await models.rollback():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No previous model to roll back to")
+    await publish_admin_decision(models)
+    return {"model_version": models.store.active.version}
 
 
 @app.post('/predict')
-async def predict(input_data: ScoringItem):
+async def predict(input_data: ScoringItem, response: Response,
+                  model_version: Optional[str] = Query(None, pattern=MODEL_VERSION_PATTERN)):
     """
     Endpoint for secure prediction based on scoring parameters.
 
     Args:
         item (ScoringItem): Input parameters for prediction.
+        model_version (str): Optional version tag to score with instead of the active model.
 
     Returns:
         dict: Prediction result, can be 1 or 0 indicating shot made or missed.
     """
-    # Create a DataFrame with the data of the request object
-    df = pd.DataFrame([input_data.model_dump()])
-    # Rename the columns to match the expected names
-    df = df.rename(columns={
-        "Minutes_Remaining": "Minutes Remaining",
-        "Seconds_Remaining": "Seconds Remaining",
-        "Shot_Distance": "Shot Distance",
-        "X_Location": "X Location",
-        "Y_Location": "Y Location",
-        # "Shot_Made_Flag": "Shot Made Flag",
-        "Action_Type_Frequency": "Action Type_Frequency",
-        "Team_Name_Frequency": "Team Name_Frequency",
-        "Home_Team_Frequency": "Home Team_Frequency",
-        "Away_Team_Frequency": "Away Team_Frequency",
-        "ShotType_2PT_Field_Goal": "ShotType_2PT Field Goal",
-        "ShotType_3PT_Field_Goal": "ShotType_3PT Field Goal",
-        "ShotZoneBasic_Above_the_Break_3": "ShotZoneBasic_Above the Break 3",
-        "ShotZoneBasic_Backcourt": "ShotZoneBasic_Backcourt",
-        "ShotZoneBasic_In_The_Paint_Non_RA": "ShotZoneBasic_In The Paint (Non-RA)",
-        "ShotZoneBasic_Left_Corner_3": "ShotZoneBasic_Left Corner 3",
-        "ShotZoneBasic_Mid_Range": "ShotZoneBasic_Mid-Range",
-        "ShotZoneBasic_Restricted_Area": "ShotZoneBasic_Restricted Area",
-        "ShotZoneBasic_Right_Corner_3": "ShotZoneBasic_Right Corner 3",
-        "ShotZoneArea_Back_Court_BC": "ShotZoneArea_Back Court(BC)",
-        "ShotZoneArea_Center_C": "ShotZoneArea_Center(C)",
-        "ShotZoneArea_Left_Side_Center_LC": "ShotZoneArea_Left Side Center(LC)",
-        "ShotZoneArea_Left_Side_L": "ShotZoneArea_Left Side(L)",
-        "ShotZoneArea_Right_Side_Center_RC": "ShotZoneArea_Right Side Center(RC)",
-        "ShotZoneArea_Right_Side_R": "ShotZoneArea_Right Side(R)",
-        "ShotZoneRange_16_24_ft": "ShotZoneRange_16-24 ft.",
-        "ShotZoneRange_24_ft": "ShotZoneRange_24+ ft.",
-        "ShotZoneRange_8_16_ft": "ShotZoneRange_8-16 ft.",
-        "ShotZoneRange_Back_Court_Shot": "ShotZoneRange_Back Court Shot",
-        "ShotZoneRange_Less_Than_8_ft": "ShotZoneRange_Less Than 8 ft.",
-        "SeasonType_Playoffs": "SeasonType_Playoffs",
-        "SeasonType_Regular_Season": "SeasonType_Regular Season",
-        "Game_ID_Frequency": "Game ID_Frequency",
-        "Game_Event_ID_Frequency": "Game Event ID_Frequency",
-        "Player_ID_Frequency": "Player ID_Frequency",
-        "Year": "Year",
-        "Month": "Month",
-        "Day": "Day",
-        "Day_of_Week": "Day_of_Week"
-    })
+    served = await resolve_model(model_version)
+    with time_stage("feature_assembly", served.version):
+        features = served.layout.row(input_data)
     # Make a prediction with the loaded model
-    yhat = model.predict(df)
+    prediction, version = await predict_one(served, features)
+    if version == served.version:
+        offer_to_shadow(served, features, [prediction])
     # Return the prediction as an answer
-    return {"prediction": int(yhat.item())}
+    response.headers["X-Model-Version"] = version
+    return {"prediction": prediction}
+
+
+@app.post('/predict/batch')
+async def predict_batch(batch: BatchScoringRequest, response: Response,
+                        model_version: Optional[str] = Query(None, pattern=MODEL_VERSION_PATTERN)):
+    """
+    Endpoint for scoring many items with a single model call.
+
+    Args:
+        batch (BatchScoringRequest): Raw scoring items.
+
+    Returns:
+        dict: 'predictions', one entry per input item in input order. Each entry holds
+        either a 'prediction' or an 'error' describing why the item was rejected.
+    """
+    served = await resolve_model(model_version)
+    results = [None] * len(batch.items)
+    valid_indices = []
+    valid_items = []
+    for index, raw_item in enumerate(batch.items):
+        try:
+            valid_items.append(ScoringItem.model_validate(raw_item))
+            valid_indices.append(index)
+        except ValidationError as e:
+            results[index] = {"error": format_validation_error(e)}
+
+    if valid_items:
+        # Score all valid items in one vectorized call
+        with time_stage("feature_assembly", served.version):
+            features = served.layout.matrix(valid_items)
+        yhat = score_batch(served, features)
+        offer_to_shadow(served, features, yhat)
+        for index, value in zip(valid_indices, yhat):
+            results[index] = {"prediction": int(value)}
+
+    response.headers["X-Model-Version"] = served.version
+    return {"predictions": results}
+
+
+@app.post('/predict/compact')
+async def predict_compact(input_data: CompactScoringItem, response: Response,
+                          model_version: Optional[str] = Query(None, pattern=MODEL_VERSION_PATTERN)):
+    """
+    Same as /predict, with the scoring parameters sent as a positional array.
+
+    Args:
+        input_data (CompactScoringItem): Schema version and values in ScoringItem field order.
+
+    Returns:
+        dict: Prediction result, can be 1 or 0 indicating shot made or missed.
+    """
+    served = await resolve_model(model_version)
+    with time_stage("feature_assembly", served.version):
+        features = served.layout.from_values([input_data.values])
+    prediction, version = await predict_one(served, features)
+    if version == served.version:
+        offer_to_shadow(served, features, [prediction])
+    response.headers["X-Model-Version"] = version
+    return {"prediction": prediction}
+
+
+@app.post('/predict/batch/compact')
+async def predict_batch_compact(batch: CompactBatchScoringRequest, response: Response,
+                                model_version: Optional[str] = Query(None, pattern=MODEL_VERSION_PATTERN)):
+    """
+    Same as /predict/batch, with every item sent as a positional array.
+
+    Args:
+        batch (CompactBatchScoringRequest): Schema version and rows in ScoringItem field order.
+
+    Returns:
+        dict: 'predictions', one entry per row in input order.
+    """
+    if any(len(row) != len(SCORING_FIELDS) for row in batch.rows):
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Every row must have {len(SCORING_FIELDS)} values")
+    served = await resolve_model(model_version)
+    results = []
+    if batch.rows:
+        with time_stage("feature_assembly", served.version):
+            features = served.layout.from_values(batch.rows)
+        yhat = score_batch(served, features)
+        offer_to_shadow(served, features, yhat)
+        results = [{"prediction": int(value)} for value in yhat]
+
+    response.headers["X-Model-Version"] = served.version
+    return {"predictions": results}
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from prometheus_client import Counter, Gauge, Histogram
+
+write_queue_depth = Gauge('prediction_write_queue_depth', 'Predictions waiting in the write-behind buffer')
+write_flush_latency = Histogram('prediction_write_flush_seconds', 'Time taken to flush one batch of buffered predictions')
+write_flush_rows = Histogram('prediction_write_flush_rows', 'Number of predictions written per flush',
+                             buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+write_dropped = Counter('prediction_write_dropped_total', 'Buffered predictions dropped after all flush attempts failed')
+
+# Marks the end of the queue when the buffer is closed
+_STOP = object()
+
+
+class PredictionWriteBuffer:
+    """
+    Write-behind buffer for prediction rows.
+
+    Rows are put on a bounded in-memory queue and a background task writes them in batches,
+    as soon as `batch_size` rows are waiting or `flush_interval` seconds after the first one
+    arrived, whichever comes first. A full queue makes `submit` wait, so rows are never
+    dropped for lack of space. Smaller `flush_interval` and `batch_size` values shorten the
+    window of rows that are lost if the process dies, at the cost of more, smaller writes.
+    """
+
+    def __init__(self, flush_func, max_queue_size=10000, batch_size=500, flush_interval=0.2, max_attempts=3):
+        self.flush_func = flush_func
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def submit(self, rows):
+        """
+        Queue rows for writing, waiting for space if the queue is full.
+
+        Args:
+            rows (list of tuple): Pairs of prediction value and input parameters dict.
+        """
+        for row in rows:
+            await self.queue.put(row)
+        write_queue_depth.set(self.queue.qsize())
+
+    async def collect(self):
+        """
+        Wait for the next batch of rows.
+
+        Returns:
+            tuple: The batch (list) and whether the buffer was asked to stop.
+        """
+        row = await self.queue.get()
+        if row is _STOP:
+            return [], True
+        batch = [row]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                row = self.queue.get_nowait()
+            else:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    async def flush(self, batch):
+        """
+        Write one batch, retrying failed writes up to `max_attempts` times.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            try:
+                await self.flush_func(batch)
+                write_flush_latency.observe(time.perf_counter() - start)
+                write_flush_rows.observe(len(batch))
+                return
+            except Exception as e:
+                print(f"Error flushing {len(batch)} predictions (attempt {attempt}/{self.max_attempts}): {e}")
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(self.flush_interval)
+        write_dropped.inc(len(batch))
+
+    async def run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self.collect()
+            write_queue_depth.set(self.queue.qsize())
+            if batch:
+                await self.flush(batch)
+
+    async def close(self):
+        """
+        Flush every queued row and stop the background task.
+        """
+        if self.task is None:
+            return
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
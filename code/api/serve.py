@@ -0,0 +1,138 @@
+"""
+Multi-process launcher for the prediction service.
+
+Binds one listening socket and forks a uvicorn server per worker on it. With --prefork
+(the default) the app is imported and the model loaded and warmed up once in the
+parent before forking, so workers start ready and share those pages copy-on-write. Model
+arrays are memory-mapped read-only (MODEL_MMAP), so models loaded later by a hot reload are
+shared through the page cache as well. Workers that die are replaced.
+
+An admin request (/model/reload, /model/rollback) reaches one worker only. That worker
+publishes the resulting model in a control file (MODEL_CONTROL_FILE) that every other worker
+polls, so all of them serve the same model within MODEL_CONTROL_POLL_INTERVAL seconds.
+
+Example:
+    python code/api/serve.py --workers 4 --port 8001
+"""
+import argparse
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+
+import uvicorn
+
+# Adjust sys.path to include the 'code' directory
+code_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, code_dir)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=os.getenv("PREDICTION_SERVICE_BIND_HOST", "0.0.0.0"))
+    parser.add_argument('--port', type=int, default=int(os.getenv("PREDICTION_SERVICE_PORT", "8001")))
+    parser.add_argument('--workers', type=int, default=int(os.getenv("PREDICTION_SERVICE_WORKERS", os.cpu_count() or 1)),
+                        help='Number of worker processes (default: one per CPU)')
+    parser.add_argument('--no-prefork', dest='prefork', action='store_false',
+                        help='Import the app in each worker after forking instead of once in the parent')
+    parser.add_argument('--log-level', default='info')
+    return parser.parse_args(argv)
+
+
+def import_app(load_models=False):
+    import api.prediction_service as service
+    if load_models:
+        try:
+            service.load_models()
+        except Exception as e:
+            # Each worker keeps retrying in its startup phase, reporting not ready meanwhile
+            print(f"Error loading model before forking: {str(e)}")
+    return service.app
+
+
+def run_worker(app, sock, args):
+    """
+    Serve app on the inherited socket until told to stop. Runs in the forked child.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if app is None:
+        app = import_app()
+    server = uvicorn.Server(uvicorn.Config(app, log_level=args.log_level))
+    server.run(sockets=[sock])
+
+
+def spawn_worker(app, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(app, sock, args)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    os.environ.setdefault("MODEL_MMAP", "true")
+    multiprocess_dir = None
+    control_dir = None
+    if args.workers > 1 and "MODEL_CONTROL_FILE" not in os.environ:
+        # Admin decisions are shared through this file, see ModelControl. Must be set before the app is imported.
+        control_dir = tempfile.mkdtemp(prefix="prediction-service-control-")
+        os.environ["MODEL_CONTROL_FILE"] = os.path.join(control_dir, "model-control.json")
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        # Let /metrics aggregate the metrics of all workers. Must be set before prometheus_client is imported.
+        multiprocess_dir = tempfile.mkdtemp(prefix="prediction-service-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = multiprocess_dir
+    from prometheus_client import multiprocess
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    app = import_app(load_models=True) if args.prefork else None
+    workers = {spawn_worker(app, sock, args) for _ in range(args.workers)}
+    print(f"Serving on {args.host}:{args.port} with {args.workers} workers (prefork: {args.prefork})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        multiprocess.mark_process_dead(pid)
+        if not stopping:
+            print(f"Worker {pid} exited, starting a new one")
+            workers.add(spawn_worker(app, sock, args))
+
+    sock.close()
+    if multiprocess_dir is not None:
+        shutil.rmtree(multiprocess_dir, ignore_errors=True)
+    if control_dir is not None:
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import random
+import time
+import numpy as np
+from prometheus_client import Counter, Histogram
+
+shadow_predictions = Counter('shadow_predictions_total', 'Items scored by a challenger model in shadow mode',
+                             ['model_version'])
+shadow_disagreements = Counter('shadow_disagreements_total',
+                               'Items where a challenger model disagreed with the champion', ['model_version'])
+shadow_latency = Histogram('shadow_scoring_seconds', 'Time a challenger model took to score one shadow batch',
+                           ['model_version'],
+                           buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1))
+shadow_dropped = Counter('shadow_dropped_total', 'Sampled requests dropped because the shadow queue was full')
+
+# Marks the end of the queue when the scorer is closed
+_STOP = object()
+
+
+class ShadowScorer:
+    """
+    Scores a sample of live traffic with challenger models, off the request path.
+
+    Handlers answer with the champion and call `offer`, which never waits: a sampled request
+    is put on a bounded queue, or dropped if the queue is full. A background task takes the
+    queued requests in batches, scores them with every challenger and records how often each
+    one disagrees with the champion and how long it took. Disagreements can also be appended
+    to a JSON lines log for later analysis.
+
+    Args:
+        get_model: Coroutine function returning the ServedModel of a version.
+        challengers (list of str): Versions scored in shadow mode.
+        sample_rate (float): Fraction of requests offered to the challengers.
+        max_queue_size (int): Requests waiting to be shadow scored before new ones are dropped.
+        batch_size (int): Requests scored together per challenger call.
+        log_path (str): Optional file disagreements are appended to.
+    """
+
+    def __init__(self, get_model, challengers, sample_rate=0.1, max_queue_size=1000, batch_size=256, log_path=None):
+        self.get_model = get_model
+        self.challengers = list(challengers)
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.log_path = log_path
+        self.queue = asyncio.Queue(maxsize=max_queue_size)
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def offer(self, champion, features, predictions):
+        """
+        Maybe queue one answered request for shadow scoring. Never blocks.
+
+        Args:
+            champion (ServedModel): Model that answered the request.
+            features (ndarray): The feature matrix it scored, in its column order.
+            predictions (array-like): Its predictions, one per row.
+        """
+        if random.random() >= self.sample_rate:
+            return
+        try:
+            self.queue.put_nowait((champion, features, np.asarray(predictions)))
+        except asyncio.QueueFull:
+            shadow_dropped.inc()
+
+    async def collect(self):
+        """
+        Wait for the next requests to shadow score.
+
+        Returns:
+            tuple: The batch (list of queued requests) and whether the scorer was asked to stop.
+        """
+        entry = await self.queue.get()
+        if entry is _STOP:
+            return [], True
+        batch = [entry]
+        while len(batch) < self.batch_size and not self.queue.empty():
+            entry = self.queue.get_nowait()
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    async def score(self, batch):
+        """
+        Score one batch with every challenger and record the disagreements.
+        """
+        # Normally every request was answered by the same champion, so this is one group
+        by_champion = {}
+        for champion, features, predictions in batch:
+            by_champion.setdefault(champion.version, (champion, []))[1].append((features, predictions))
+
+        log_lines = []
+        for version in self.challengers:
+            try:
+                challenger = await self.get_model(version)
+            except Exception as e:
+                print(f"Error loading shadow model {version}: {str(e)}")
+                continue
+            for champion, entries in by_champion.values():
+                if challenger.version == champion.version:
+                    continue
+                features = np.vstack([features for features, _ in entries])
+                predictions = np.concatenate([predictions for _, predictions in entries])
+                challenger_features = features
+                if challenger.layout.feature_names != champion.layout.feature_names:
+                    # Same columns in another order, see FeatureLayout
+                    names = champion.layout.feature_names
+                    challenger_features = features[:, [names.index(name) for name in challenger.layout.feature_names]]
+
+                start = time.perf_counter()
+                # In a worker thread: a challenger scored by sklearn would otherwise hold up the champion's requests
+                challenger_predictions = await asyncio.to_thread(challenger.predict, challenger_features)
+                shadow_latency.labels(model_version=version).observe(time.perf_counter() - start)
+                shadow_predictions.labels(model_version=version).inc(len(predictions))
+                disagreements = np.flatnonzero(challenger_predictions != predictions)
+                if len(disagreements):
+                    shadow_disagreements.labels(model_version=version).inc(len(disagreements))
+                if self.log_path:
+                    log_lines.extend(json.dumps({
+                        'ts': round(time.time(), 3),
+                        'champion': champion.version,
+                        'challenger': version,
+                        'champion_prediction': int(predictions[index]),
+                        'challenger_prediction': int(challenger_predictions[index]),
+                        'features': features[index].tolist(),
+                    }, separators=(',', ':')) for index in disagreements)
+        if log_lines:
+            await asyncio.to_thread(self.write_log, log_lines)
+
+    def write_log(self, lines):
+        with open(self.log_path, 'a') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    async def run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self.collect()
+            if batch:
+                try:
+                    await self.score(batch)
+                except Exception as e:
+                    print(f"Error in shadow scoring: {str(e)}")
+
+    async def close(self):
+        """
+        Score what is still queued and stop the background task.
+        """
+        if self.task is None:
+            return
+        await self.queue.put(_STOP)
+        await self.task
+        self.task = None
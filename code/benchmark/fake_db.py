@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+import json
+from contextlib import asynccontextmanager
+
+import asyncpg
+
+
+class FakeConnection:
+    """
+    In-memory stand-in for an asyncpg connection.
+
+    It understands only the queries issued by api/nba_app.py, recognised by their text,
+    and answers them from the tables held by the owning FakePool.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def transaction(self, **kwargs):
+        @asynccontextmanager
+        async def transaction():
+            yield
+        return transaction()
+
+    def unverified_ids(self):
+        return [row['id'] for row in self.pool.predictions if row['user_verification'] is None]
+
+    async def fetchval(self, query, *args):
+        await asyncio.sleep(self.pool.latency)
+        if "COUNT(*) FROM users" in query:
+            return sum(1 for user in self.pool.users if user['username'] == args[0])
+        if "information_schema.tables" in query:
+            return True
+        raise NotImplementedError(query)
+
+    async def fetchrow(self, query, *args):
+        await asyncio.sleep(self.pool.latency)
+        if "FROM users" in query:
+            return next((dict(user) for user in self.pool.users if user['username'] == args[0]), None)
+        if "min(id)" in query:
+            ids = self.unverified_ids()
+            return {'low': min(ids) if ids else None, 'high': max(ids) if ids else None}
+        if "WHERE user_verification IS NULL AND id >= $1" in query:
+            # Predictions are appended in id order, so the first match is the smallest id
+            return next((dict(row) for row in self.pool.predictions
+                         if row['user_verification'] is None and row['id'] >= args[0]), None)
+        if "FROM predictions WHERE id = $1" in query:
+            return next((dict(row) for row in self.pool.predictions if row['id'] == args[0]), None)
+        raise NotImplementedError(query)
+
+    async def execute(self, query, *args):
+        await asyncio.sleep(self.pool.latency)
+        if "INSERT INTO users" in query:
+            if any(user['username'] == args[0] for user in self.pool.users):
+                raise asyncpg.UniqueViolationError("duplicate key value violates unique constraint")
+            self.pool.users.append({'username': args[0], 'hashed_password': args[1], 'disabled': args[2]})
+        elif "INSERT INTO predictions" in query and "unnest" in query:
+            for prediction, input_parameters in zip(*args):
+                self.pool.add_prediction(prediction, json.loads(input_parameters))
+        elif "INSERT INTO predictions" in query:
+            self.pool.add_prediction(args[0], args[1])
+        elif "UPDATE predictions SET user_verification" in query:
+            for row in self.pool.predictions:
+                if row['id'] == args[1]:
+                    row['user_verification'] = args[0]
+        else:
+            raise NotImplementedError(query)
+        return "OK"
+
+    async def cursor(self, query, *args, prefetch=None):
+        for row in list(self.pool.predictions):
+            yield dict(row)
+
+
+class FakePool:
+    """
+    In-memory stand-in for the asyncpg pool used by api/nba_app.py.
+
+    Args:
+        latency (float): Seconds every query sleeps, to mimic a database round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.users = []
+        self.predictions = []
+
+    def add_prediction(self, prediction, input_parameters):
+        self.predictions.append({
+            'id': len(self.predictions) + 1,
+            'prediction': prediction,
+            'user_verification': None,
+            'input_parameters': input_parameters,
+            'timestamp': datetime.datetime.now()
+        })
+
+    async def acquire(self, timeout=None):
+        return FakeConnection(self)
+
+    async def release(self, conn):
+        pass
+
+    async def close(self):
+        pass
@@ -0,0 +1,278 @@
+"""
+Reproducible load test for the gateway API.
+
+Runs api/nba_app.py in-process against an in-memory fake database (or a local PostgreSQL)
+and a stubbed (or the real, in-process) prediction service, replays recorded or synthetic
+ScoringItem traffic at fixed concurrency levels and writes req/s and latency percentiles
+per endpoint to a JSON file that can be compared across commits.
+
+Example:
+    python code/benchmark/load_test.py --concurrency 1,8,32 --requests 500
+    python code/benchmark/load_test.py --compare reports/load_test_results-old.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+# Adjust sys.path to include the 'project' directory
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, project_dir)
+
+code_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, code_dir)
+
+from benchmark.fake_db import FakePool
+from api.prediction_client import PredictionServiceClient
+
+ENDPOINTS = ['/login', '/predict', '/verify_random_prediction']
+DEFAULT_OUTPUT_FILE = os.path.join(project_dir, 'reports', 'load_test_results.json')
+
+# Field ranges used to generate synthetic scoring items
+FLOAT_FIELDS = {
+    'Period': (1, 4), 'Minutes_Remaining': (0, 11), 'Seconds_Remaining': (0, 59), 'Shot_Distance': (0, 40),
+    'X_Location': (-250, 250), 'Y_Location': (-50, 400),
+}
+YEAR_RANGE = (1997, 2020)
+
+
+def synthetic_scoring_items(count, seed=42):
+    """
+    Generate reproducible ScoringItem payloads.
+
+    Args:
+        count (int): Number of payloads.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        list of dict: The payloads.
+    """
+    from api.features import ScoringItem
+
+    rng = random.Random(seed)
+    items = []
+    for _ in range(count):
+        item = {}
+        for name, field in ScoringItem.model_fields.items():
+            if name in FLOAT_FIELDS:
+                low, high = FLOAT_FIELDS[name]
+                item[name] = round(rng.uniform(low, high), 2)
+            elif field.annotation is float:
+                item[name] = round(rng.random(), 4)
+            else:
+                item[name] = rng.randint(0, 1)
+        item['Year'] = rng.randint(*YEAR_RANGE)
+        item['Month'] = rng.randint(1, 12)
+        item['Day'] = rng.randint(1, 28)
+        item['Day_of_Week'] = rng.randint(0, 6)
+        items.append(item)
+    return items
+
+
+def load_traffic(file_path):
+    """
+    Load recorded ScoringItem payloads, one JSON object per line.
+    """
+    with open(file_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def stub_prediction_service(latency):
+    """
+    Transport answering like the prediction service without loading a model.
+
+    Args:
+        latency (float): Seconds every call sleeps, to mimic the network hop and scoring.
+    """
+    async def handler(request):
+        await asyncio.sleep(latency)
+        headers = {'X-Model-Version': 'stub'}
+        if request.url.path == '/model':
+            return httpx.Response(200, json={'model_version': 'stub'}, headers=headers)
+        if request.url.path == '/predict/batch':
+            items = json.loads(request.content)['items']
+            return httpx.Response(200, json={'predictions': [{'prediction': 0} for _ in items]}, headers=headers)
+        return httpx.Response(200, json={'prediction': 0}, headers=headers)
+    return httpx.MockTransport(handler)
+
+
+def summarize(endpoint, concurrency, latencies, errors, elapsed):
+    latencies_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (None, None, None)
+    return {
+        'endpoint': endpoint,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'p50_ms': None if p50 is None else round(float(p50), 3),
+        'p95_ms': None if p95 is None else round(float(p95), 3),
+        'p99_ms': None if p99 is None else round(float(p99), 3),
+    }
+
+
+async def run_level(client, endpoint, concurrency, total_requests, make_request):
+    """
+    Send total_requests requests to endpoint from `concurrency` concurrent workers.
+
+    Returns:
+        dict: Throughput and latency percentiles for this endpoint and concurrency level.
+    """
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            response = await make_request(client, index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(endpoint, concurrency, latencies, errors, time.perf_counter() - start)
+
+
+async def run_benchmark(args, items):
+    import api.nba_app as nba_app
+
+    if args.db == 'fake':
+        fake_pool = FakePool(latency=args.db_latency_ms / 1000)
+
+        async def create_fake_db_pool():
+            return fake_pool
+        nba_app.create_db_pool = create_fake_db_pool
+
+        # The index is built on a connection of its own, outside the pool
+        async def skip_unverified_index():
+            pass
+        nba_app.ensure_unverified_index = skip_unverified_index
+
+    prediction_service_lifespan = contextlib.nullcontext()
+    if args.prediction_service == 'stub':
+        transport = stub_prediction_service(args.prediction_latency_ms / 1000)
+    else:
+        import api.prediction_service as prediction_service
+        transport = httpx.ASGITransport(app=prediction_service.app)
+        # ASGITransport does not run the lifespan, whose startup phase makes the service ready.
+        # With the model loaded first, it is ready once the lifespan is entered.
+        prediction_service.load_models()
+        prediction_service_lifespan = prediction_service.lifespan(prediction_service.app)
+    nba_app.create_prediction_client = lambda: PredictionServiceClient('http://prediction-service', transport=transport)
+
+    login_data = {'username': nba_app.username, 'password': nba_app.password}
+
+    async def login(client, index):
+        return await client.post('/login', data=login_data)
+
+    async def predict(client, index):
+        return await client.post('/predict', json=items[index % len(items)], headers=auth_headers)
+
+    async def verify(client, index):
+        return await client.get('/verify_random_prediction', headers=auth_headers)
+
+    requests_by_endpoint = {'/login': login, '/predict': predict, '/verify_random_prediction': verify}
+
+    results = []
+    async with prediction_service_lifespan, nba_app.lifespan(nba_app.app):
+        transport = httpx.ASGITransport(app=nba_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://gateway', timeout=60) as client:
+            response = await login(client, 0)
+            response.raise_for_status()
+            auth_headers = {'Authorization': f"Bearer {response.json()['access_token']}"}
+
+            for endpoint in args.endpoints:
+                for concurrency in args.concurrency:
+                    # Warm up caches and connections before measuring
+                    await run_level(client, endpoint, concurrency, min(args.warmup, args.requests), requests_by_endpoint[endpoint])
+                    result = await run_level(client, endpoint, concurrency, args.requests, requests_by_endpoint[endpoint])
+                    print(f"{endpoint:<28} c={concurrency:<4} {result['requests_per_second']:>10} req/s  "
+                          f"p50={result['p50_ms']}ms p95={result['p95_ms']}ms p99={result['p99_ms']}ms errors={result['errors']}")
+                    results.append(result)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_dir, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, results):
+    """
+    Print the relative change of req/s and p99 against a previous results file.
+    """
+    previous = {(r['endpoint'], r['concurrency']): r for r in baseline['results']}
+    print(f"\nCompared to {baseline['meta'].get('git_commit')}:")
+    for result in results:
+        old = previous.get((result['endpoint'], result['concurrency']))
+        if not old or not old['requests_per_second'] or not old['p99_ms']:
+            continue
+        rps_change = (result['requests_per_second'] / old['requests_per_second'] - 1) * 100
+        p99_change = (result['p99_ms'] / old['p99_ms'] - 1) * 100
+        print(f"{result['endpoint']:<28} c={result['concurrency']:<4} req/s {rps_change:+.1f}%  p99 {p99_change:+.1f}%")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=lambda s: s.split(','), default=ENDPOINTS,
+                        help='Comma separated endpoints to benchmark, in order (default: all)')
+    parser.add_argument('--concurrency', type=lambda s: [int(c) for c in s.split(',')], default=[1, 8, 32],
+                        help='Comma separated concurrency levels (default: 1,8,32)')
+    parser.add_argument('--requests', type=int, default=500, help='Measured requests per endpoint and concurrency level')
+    parser.add_argument('--warmup', type=int, default=50, help='Unmeasured requests before each level')
+    parser.add_argument('--traffic', help='JSON lines file with recorded ScoringItem payloads (default: synthetic)')
+    parser.add_argument('--unique-items', type=int, default=1000, help='Number of synthetic payloads to cycle through')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for synthetic traffic')
+    parser.add_argument('--db', choices=['fake', 'postgres'], default='fake',
+                        help="'fake' for the in-memory database, 'postgres' for the one configured by DB_* variables")
+    parser.add_argument('--db-latency-ms', type=float, default=0.5, help='Simulated query latency of the fake database')
+    parser.add_argument('--prediction-service', choices=['stub', 'real'], default='stub',
+                        help="'stub' for a constant answer, 'real' to run prediction_service.py in-process")
+    parser.add_argument('--prediction-latency-ms', type=float, default=1.0, help='Simulated latency of the stubbed service')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_FILE, help='Where to write the JSON results')
+    parser.add_argument('--compare', help='Previous results file to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    items = load_traffic(args.traffic) if args.traffic else synthetic_scoring_items(args.unique_items, args.seed)
+
+    results = asyncio.run(run_benchmark(args, items))
+
+    report = {
+        'meta': {
+            'git_commit': git_commit(),
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -25,3 +25,6 @@ CREATE TABLE IF NOT EXISTS predictions (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Partial index over unverified predictions, used to sample a random one in constant time
+CREATE INDEX IF NOT EXISTS predictions_unverified_id_idx
+    ON predictions (id) WHERE user_verification IS NULL;
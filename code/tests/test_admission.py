@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+from api.admission import AdmissionLimiter, AdmissionRejected
+
+
+class TestAdmissionLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_rejects_when_queue_is_full(self):
+        limiter = AdmissionLimiter("test", max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as context:
+            async with limiter.slot():
+                pass
+        self.assertEqual(context.exception.reason, "queue_full")
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        self.assertEqual(limiter.waiting, 0)
+
+    async def test_rejects_after_queue_timeout(self):
+        limiter = AdmissionLimiter("test", max_concurrency=1, max_queue=4, queue_timeout=0.01)
+        async with limiter.slot():
+            with self.assertRaises(AdmissionRejected) as context:
+                async with limiter.slot():
+                    pass
+        self.assertEqual(context.exception.reason, "timeout")
+
+        # The slot is free again once the holder is done
+        async with limiter.slot():
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+from api.cache import TTLCache, PredictionCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_get_and_expire(self):
+        self.cache.set('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+        self.timer.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')  # 'b' becomes the least recently used entry
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 1)
+        self.assertEqual(self.cache.get('c'), 3)
+
+    def test_invalidate(self):
+        self.cache.set('a', 1)
+        self.cache.invalidate('a')
+        self.cache.invalidate('missing')
+        self.assertIsNone(self.cache.get('a'))
+
+
+class TestPredictionCache(unittest.IsolatedAsyncioTestCase):
+
+    async def test_single_flight_and_version_invalidation(self):
+        cache = PredictionCache(maxsize=10, ttl=60)
+        cache.set_model_version('v1')
+        calls = []
+        release = asyncio.Event()
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return {'prediction': 1}
+
+        first = asyncio.create_task(cache.get_or_fetch({'a': 1, 'b': 2}, fetch))
+        second = asyncio.create_task(cache.get_or_fetch({'b': 2, 'a': 1}, fetch))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(first, second)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(outcome for _, outcome in results), ['coalesced', 'miss'])
+        self.assertEqual((await cache.get_or_fetch({'a': 1, 'b': 2}, fetch))[1], 'hit')
+
+        # A new model version drops the cached result
+        self.assertTrue(cache.set_model_version('v2'))
+        self.assertEqual((await cache.get_or_fetch({'a': 1, 'b': 2}, fetch))[1], 'miss')
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
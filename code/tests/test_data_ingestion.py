@@ -1,8 +1,10 @@
 import os
+import tempfile
 import unittest
 import pandas as pd
 from unittest.mock import patch
-from training_pipeline.data_ingestion import fetch_data_from_csv, validate_data, append_data, save_data
+from training_pipeline.data_ingestion import fetch_data_from_csv, validate_data, append_data, save_data, import_legacy_data
+from training_pipeline.storage import read_dataset, read_manifest
 
 
 # Mock the config module
@@ -53,17 +55,26 @@ class TestDataIngestion(unittest.TestCase):
         result = append_data(empty_data, new_data)
         pd.testing.assert_frame_equal(result, new_data)
 
-    @patch('training_pipeline.data_ingestion.pd.DataFrame.to_csv')
-    @patch('training_pipeline.data_ingestion.os.makedirs')
-    def test_save_data(self, mock_makedirs, mock_to_csv):
-        # Test saving data to a CSV file
-        data = pd.DataFrame({'col1': [1, 2], 'col2': [3, 4]})
-        save_data(data, 'output.csv')
+    def test_save_data(self):
+        # Test saving batches as segments of a dataset, creating its directory
+        first = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+        second = pd.DataFrame({'col1': [3], 'col2': ['c']})
+        with tempfile.TemporaryDirectory() as tmp:
+            dataset_dir = os.path.join(tmp, 'raw')
+            save_data(first, dataset_dir)
+            save_data(second, dataset_dir, source='new_data.csv')
+            pd.testing.assert_frame_equal(read_dataset(dataset_dir), append_data(first, second))
+            self.assertEqual([segment['rows'] for segment in read_manifest(dataset_dir)['segments']], [2, 1])
 
-        # Ensure directories are created if they don't exist
-        mock_makedirs.assert_called_once_with(os.path.dirname('output.csv'), exist_ok=True)
-        # Ensure data is saved to CSV
-        mock_to_csv.assert_called_once_with('output.csv', index=False)
+    def test_import_legacy_data(self):
+        data = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy_path = os.path.join(tmp, 'raw.csv')
+            data.to_csv(legacy_path, index=False)
+            dataset_dir = os.path.join(tmp, 'raw')
+            import_legacy_data(dataset_dir, [os.path.join(tmp, 'raw.parquet'), legacy_path])
+            import_legacy_data(dataset_dir, [legacy_path])
+            pd.testing.assert_frame_equal(read_dataset(dataset_dir), data)
 
 
 if __name__ == '__main__':
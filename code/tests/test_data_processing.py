@@ -1,7 +1,12 @@
+import os
+import tempfile
 import unittest
+import numpy as np
 import pandas as pd
 from training_pipeline.data_processing import clean_data, transform_data, frequency_encode_column, transform_attributes_with_high_cardinality
 from training_pipeline.data_processing import transform_quantitative_attributes_with_unique_ids, one_hot_encoding
+from training_pipeline.data_processing import process_in_chunks, row_fingerprints
+from training_pipeline.storage import append_segment, read_table
 
 
 class TestDataPreprocessing(unittest.TestCase):
@@ -48,6 +53,49 @@ class TestDataPreprocessing(unittest.TestCase):
         self.assertNotIn('Shot Type', transformed_data.columns)  # Check if columns are dropped
         self.assertTrue(transformed_data.columns.str.startswith('ShotType').any())  # Check for one-hot encoded columns
 
+    def test_process_in_chunks_matches_in_memory(self):
+        data = self.data.copy()
+        data['Player Name'] = 'Player'
+        data['Team ID'] = 1
+        data['Shot Distance'] = [22.0, 0.0, 1.0, 1.0, np.nan]  # one missing value, one duplicate
+        with tempfile.TemporaryDirectory() as tmp:
+            dataset_dir = os.path.join(tmp, 'raw')
+            # The duplicate spans two segments and 'Playoffs' only appears in the first chunk
+            append_segment(data.iloc[:3], dataset_dir)
+            append_segment(data.iloc[3:], dataset_dir)
+            output_file_path = os.path.join(tmp, 'processed.parquet')
+            process_in_chunks(dataset_dir, output_file_path, chunk_rows=2)
+
+            expected = transform_data(clean_data(data)).reset_index(drop=True)
+            pd.testing.assert_frame_equal(read_table(output_file_path), expected, check_exact=True)
+
+            # Integer columns are float64 in memory once a later segment has a missing value in
+            # them, so the chunks without one must be too: the duplicate of the third row then
+            # has the same fingerprint and 'Shot Distance' the same type in every chunk
+            data = self.data.copy()
+            data['Shot Distance'] = [22, 0, 1, 1, 5]
+            nullable_dir = os.path.join(tmp, 'nullable')
+            append_segment(data.iloc[:3], nullable_dir)
+            data.loc[4, ['Game ID', 'Shot Distance']] = np.nan
+            append_segment(data.iloc[3:], nullable_dir)
+            process_in_chunks(nullable_dir, output_file_path, chunk_rows=2)
+            expected = transform_data(clean_data(data)).reset_index(drop=True)
+            pd.testing.assert_frame_equal(read_table(output_file_path), expected, check_exact=True)
+
+            # No row survives cleaning
+            data = self.data.copy()
+            data['Shot Distance'] = np.nan
+            empty_dir = os.path.join(tmp, 'empty')
+            append_segment(data, empty_dir)
+            process_in_chunks(empty_dir, output_file_path, chunk_rows=2)
+            expected = transform_data(clean_data(data)).reset_index(drop=True)
+            pd.testing.assert_frame_equal(read_table(output_file_path), expected, check_exact=True)
+
+    def test_row_fingerprint_halves_differ_for_numbers(self):
+        first, second = row_fingerprints(self.data[['Game ID', 'Player ID']])
+        self.assertFalse((first == second).any())
+        self.assertEqual(first[2], first[3])  # duplicate rows
+
 
 if __name__ == '__main__':
     unittest.main()
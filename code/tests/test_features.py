@@ -0,0 +1,33 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+from api.features import FeatureLayout
+
+FIELDS = ['Shot_Distance', 'Period', 'Year']
+RENAMES = {'Shot_Distance': 'Shot Distance'}
+
+
+class TestFeatureLayout(unittest.TestCase):
+
+    def setUp(self):
+        model = SimpleNamespace(feature_names_in_=np.array(['Period', 'Shot Distance', 'Year'], dtype=object))
+        self.layout = FeatureLayout(FIELDS, RENAMES, model)
+
+    def test_orders_columns_like_the_model(self):
+        item = SimpleNamespace(Shot_Distance=12.5, Period=3, Year=2010)
+
+        np.testing.assert_array_equal(self.layout.row(item), [[3, 12.5, 2010]])
+        np.testing.assert_array_equal(self.layout.matrix([item, item]), [[3, 12.5, 2010]] * 2)
+        np.testing.assert_array_equal(self.layout.from_values([[12.5, 3, 2010]]), [[3, 12.5, 2010]])
+
+    def test_rejects_fields_not_matching_the_model(self):
+        model = SimpleNamespace(feature_names_in_=np.array(['Period', 'Shot_Distance', 'Year'], dtype=object))
+        with self.assertRaises(ValueError):
+            FeatureLayout(FIELDS, RENAMES, model)
+        with self.assertRaises(ValueError):
+            FeatureLayout(FIELDS, RENAMES, SimpleNamespace(n_features_in_=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
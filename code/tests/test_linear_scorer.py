@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from api.linear_scorer import LinearScorer, fuse_scaler
+
+
+class TestLinearScorer(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.raw = pd.DataFrame({
+            'Shot Distance': rng.uniform(0, 40, 500),
+            'X Location': rng.uniform(-250, 250, 500),
+            'ShotType_3PT Field Goal': rng.integers(0, 2, 500),
+        })
+        target = (self.raw['Shot Distance'] + rng.normal(0, 10, 500) < 15).astype(int)
+        self.scaled_columns = ['Shot Distance', 'X Location']
+        self.scaler = StandardScaler()
+        self.scaled = self.raw.copy()
+        self.scaled[self.scaled_columns] = self.scaler.fit_transform(self.raw[self.scaled_columns])
+        self.model = LogisticRegression().fit(self.scaled, target)
+
+    def test_fused_scorer_matches_the_scaled_pipeline(self):
+        scorer = fuse_scaler(self.model, self.scaler, self.scaled_columns, version='model-v1')
+
+        np.testing.assert_allclose(scorer.predict_proba(self.raw.to_numpy(dtype=float)),
+                                   self.model.predict_proba(self.scaled), rtol=1e-9)
+        np.testing.assert_array_equal(scorer.predict(self.raw.to_numpy(dtype=float)), self.model.predict(self.scaled))
+
+    def test_save_and_load(self):
+        scorer = fuse_scaler(self.model, self.scaler, self.scaled_columns, version='model-v1')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model-v1.npz')
+            scorer.save(path)
+            loaded = LinearScorer.load(path)
+            mapped = LinearScorer.load(path, mmap=True)
+            np.testing.assert_array_equal(mapped.coef, scorer.coef)
+            self.assertFalse(mapped.coef.flags.writeable)
+            del mapped
+
+        np.testing.assert_array_equal(loaded.coef, scorer.coef)
+        self.assertEqual(loaded.intercept, scorer.intercept)
+        self.assertEqual(list(loaded.feature_names_in_), list(self.raw.columns))
+        self.assertEqual(loaded.metadata['version'], 'model-v1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import asyncio
+import unittest
+
+import numpy as np
+from api.micro_batcher import MicroBatcher
+
+
+class TestMicroBatcher(unittest.IsolatedAsyncioTestCase):
+
+    async def test_scores_concurrent_requests_together(self):
+        batch_sizes = []
+
+        def score(features):
+            batch_sizes.append(len(features))
+            return features[:, 0] * 10
+
+        batcher = MicroBatcher(score, max_batch_size=3, max_wait=0.05)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.submit(np.array([[value]])) for value in range(5)))
+        await batcher.close()
+
+        self.assertEqual(results, [0, 10, 20, 30, 40])
+        self.assertEqual(batch_sizes, [3, 2])
+
+    async def test_passes_scoring_errors_to_every_caller(self):
+        def score(features):
+            raise RuntimeError("model failed")
+
+        batcher = MicroBatcher(score, max_batch_size=2, max_wait=0.01)
+        batcher.start()
+        results = await asyncio.gather(batcher.submit(np.zeros((1, 1))), batcher.submit(np.zeros((1, 1))),
+                                       return_exceptions=True)
+        await batcher.close()
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import asyncio
+import glob
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from api.model_store import ModelCache, ModelControl, ModelRepository, ModelStore, ServedModel
+from api.prediction_service import COLUMN_RENAMES, SCORING_FIELDS
+
+trained_models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'trained_models'))
+model_files = sorted(glob.glob(os.path.join(trained_models_dir, 'model_best_lr-v*-*.joblib')))
+
+
+class TestModelStore(unittest.TestCase):
+
+    def test_activate_and_rollback(self):
+        first = ServedModel(model_files[0], SCORING_FIELDS, COLUMN_RENAMES)
+        second = ServedModel(model_files[1], SCORING_FIELDS, COLUMN_RENAMES)
+        store = ModelStore(first)
+
+        store.activate(second)
+        self.assertIs(store.active, second)
+        self.assertIs(store.previous, first)
+
+        self.assertTrue(store.rollback())
+        self.assertIs(store.active, first)
+        self.assertIn(second.path, store.rejected_paths)
+        self.assertFalse(store.rollback())
+
+    def test_rejects_model_not_matching_the_fields(self):
+        with self.assertRaises(ValueError):
+            ServedModel(model_files[0], SCORING_FIELDS[:-1], COLUMN_RENAMES)
+
+
+class TestModelCache(unittest.IsolatedAsyncioTestCase):
+
+    async def test_loads_once_and_evicts_least_recently_used(self):
+        loads = []
+
+        def load(version):
+            loads.append(version)
+            return SimpleNamespace(version=version, nbytes=10)
+
+        cache = ModelCache(load, max_bytes=20, pinned=['pinned'])
+        await cache.preload()
+        await asyncio.gather(cache.get('a'), cache.get('a'))
+        await cache.get('b')
+        await cache.get('a')
+        await cache.get('c')
+
+        self.assertEqual(loads, ['pinned', 'a', 'b', 'c'])
+        self.assertEqual(list(cache.models), ['pinned', 'a', 'c'])
+
+    async def test_load_errors_are_not_cached(self):
+        def load(version):
+            raise FileNotFoundError(version)
+
+        cache = ModelCache(load, max_bytes=20)
+        with self.assertRaises(FileNotFoundError):
+            await cache.get('missing')
+        self.assertEqual(cache.loading, {})
+        self.assertEqual(len(cache.models), 0)
+
+
+class TestModelRepository(unittest.IsolatedAsyncioTestCase):
+
+    async def test_serves_latest_and_resolves_versions(self):
+        models = ModelRepository(trained_models_dir, 'model_best_lr', SCORING_FIELDS, COLUMN_RENAMES)
+        self.assertEqual(models.store.active.path, models.latest_path())
+        self.assertEqual(len(models.available_versions()), len(model_files))
+
+        self.assertIs(await models.resolve(), models.store.active)
+        other = next(path for path in model_files if path != models.store.active.path)
+        version = os.path.splitext(os.path.basename(other))[0]
+        self.assertEqual((await models.resolve(version)).version, version)
+        with self.assertRaises(FileNotFoundError):
+            await models.resolve('model_best_lr-v0-missing')
+
+    async def test_reload_and_rollback(self):
+        models = ModelRepository(trained_models_dir, 'model_best_lr', SCORING_FIELDS, COLUMN_RENAMES)
+        latest = models.store.active
+        other = next(path for path in model_files if path != latest.path)
+
+        self.assertTrue(await models.reload(other))
+        self.assertFalse(await models.reload(other))
+        self.assertEqual(models.store.active.path, other)
+        self.assertTrue(await models.rollback())
+        self.assertIs(models.store.active, latest)
+
+    async def test_admin_decisions_reach_other_workers(self):
+        handling = ModelRepository(trained_models_dir, 'model_best_lr', SCORING_FIELDS, COLUMN_RENAMES)
+        following = ModelRepository(trained_models_dir, 'model_best_lr', SCORING_FIELDS, COLUMN_RENAMES)
+        latest = handling.store.active.path
+        other = next(path for path in model_files if path != latest)
+        with tempfile.TemporaryDirectory() as directory:
+            control = ModelControl(os.path.join(directory, 'model-control.json'))
+            self.assertIsNone(control.read())
+            await handling.reload(other)
+            control.publish(handling.store)
+            self.assertTrue(await following.apply(control.read()))
+            self.assertEqual(following.store.active.path, other)
+
+            follower = asyncio.create_task(following.follow(ModelControl(control.path), 0.01))
+            try:
+                # The rolled back file is skipped by every worker, not only the one that handled the request
+                await handling.rollback()
+                control.publish(handling.store)
+                for _ in range(100):
+                    if following.store.active.path == latest:
+                        break
+                    await asyncio.sleep(0.01)
+                self.assertEqual(following.store.active.path, latest)
+                self.assertIn(other, following.store.rejected_paths)
+            finally:
+                follower.cancel()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 from fastapi.testclient import TestClient
-from api.nba_app import app, lifespan
+from api.nba_app import app, lifespan, SCORING_FIELDS
 import pytest
 import asyncio
+import json
 
 test_client = TestClient(app)
 
@@ -247,3 +248,119 @@ def test_predict_endpoint_unauthorized(client: TestClient):
     }
     response = client.post("/predict", json=data)
     assert response.status_code == 401, f"Expected 401 Unauthorized, got {response.status_code}"
+
+
+def test_predict_batch_endpoint(client: TestClient):
+    """
+    Test the batch predict endpoint with a mix of valid and invalid items.
+
+    Results must come back in input order, with an error only for the invalid item.
+    """
+    item = {
+        "Period": 1,
+        "Minutes_Remaining": 10,
+        "Seconds_Remaining": 30,
+        "Shot_Distance": 15,
+        "X_Location": 20,
+        "Y_Location": 50,
+        "Action_Type_Frequency": 0.01,
+        "Team_Name_Frequency": 0.5,
+        "Home_Team_Frequency": 0.4,
+        "Away_Team_Frequency": 0.6,
+        "ShotType_2PT_Field_Goal": 0,
+        "ShotType_3PT_Field_Goal": 1,
+        "ShotZoneBasic_Above_the_Break_3": 1,
+        "ShotZoneBasic_Backcourt": 0,
+        "ShotZoneBasic_In_The_Paint_Non_RA": 0,
+        "ShotZoneBasic_Left_Corner_3": 0,
+        "ShotZoneBasic_Mid_Range": 0,
+        "ShotZoneBasic_Restricted_Area": 0,
+        "ShotZoneBasic_Right_Corner_3": 0,
+        "ShotZoneArea_Back_Court_BC": 1,
+        "ShotZoneArea_Center_C": 0,
+        "ShotZoneArea_Left_Side_Center_LC": 0,
+        "ShotZoneArea_Left_Side_L": 0,
+        "ShotZoneArea_Right_Side_Center_RC": 1,
+        "ShotZoneArea_Right_Side_R": 0,
+        "ShotZoneRange_16_24_ft": 0,
+        "ShotZoneRange_24_ft": 1,
+        "ShotZoneRange_8_16_ft": 0,
+        "ShotZoneRange_Back_Court_Shot": 1,
+        "ShotZoneRange_Less_Than_8_ft": 0,
+        "SeasonType_Playoffs": 1,
+        "SeasonType_Regular_Season": 0,
+        "Game_ID_Frequency": 0.8,
+        "Game_Event_ID_Frequency": 0.7,
+        "Player_ID_Frequency": 0.9,
+        "Year": 2022,
+        "Month": 6,
+        "Day": 11,
+        "Day_of_Week": 5
+    }
+    invalid_item = dict(item, Period="not a number")
+
+    token = get_token(client)
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+
+    response = client.post("/predict/batch", json={"items": [item, invalid_item, item]}, headers=headers)
+
+    assert response.status_code == 200
+    results = response.json()["predictions"]
+    assert len(results) == 3
+    assert results[0] == {"prediction": 0}
+    assert "error" in results[1]
+    assert results[2] == {"prediction": 0}
+
+
+def test_export_predictions_endpoint(client: TestClient):
+    """
+    Test the predictions export endpoint in both formats.
+    """
+    token = get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.get("/predictions/export", params={"verified": "false"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    for line in response.text.splitlines():
+        row = json.loads(line)
+        assert row["user_verification"] is None
+        assert "input_parameters" in row
+
+    response = client.get("/predictions/export", params={"format": "csv"}, headers=headers)
+    assert response.status_code == 200
+    assert response.text.splitlines()[0] == "id,prediction,user_verification,timestamp,input_parameters"
+
+
+def test_predict_compact_endpoint(client: TestClient):
+    """
+    Test the compact predict endpoint, which takes the scoring parameters as a positional array.
+    """
+    # Same values as test_predict_endpoint_shot_missed, in ScoringItem field order
+    values = [1, 10, 30, 15, 20, 50, 0.01, 0.5, 0.4, 0.6, 0, 1, 1, 0, 0, 0, 0, 0, 0, 1,
+              0, 0, 0, 1, 0, 0, 1, 0, 1, 0, 1, 0, 0.8, 0.7, 0.9, 2022, 6, 11, 5]
+
+    token = get_token(client)
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+
+    response = client.post("/predict/compact", json={"schema_version": 1, "values": values}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["prediction"] == 0
+
+    # Unknown schema versions and wrong lengths are rejected
+    response = client.post("/predict/compact", json={"schema_version": 99, "values": values}, headers=headers)
+    assert response.status_code == 422
+    response = client.post("/predict/compact", json={"schema_version": 1, "values": values[:-1]}, headers=headers)
+    assert response.status_code == 422
+
+    # Int fields reject fractional values, as in the named format
+    fractional = list(values)
+    fractional[SCORING_FIELDS.index("ShotType_2PT_Field_Goal")] = 0.4
+    response = client.post("/predict/compact", json={"schema_version": 1, "values": fractional}, headers=headers)
+    assert response.status_code == 422
@@ -0,0 +1,68 @@
+import unittest
+import httpx
+from api.prediction_client import PredictionServiceClient, CircuitBreaker, CircuitOpenError
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_threshold_and_recovers(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # With reset_timeout=0 the next call is a half-open trial
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_rejects_while_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow_request())
+
+
+class TestPredictionServiceClient(unittest.IsolatedAsyncioTestCase):
+
+    def make_client(self, handler, **kwargs):
+        return PredictionServiceClient("http://prediction-service", transport=httpx.MockTransport(handler),
+                                       backoff_base=0, **kwargs)
+
+    async def test_retries_server_errors(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"prediction": 1})
+
+        client = self.make_client(handler, max_retries=2)
+        response = await client.post("/predict", json={})
+        await client.aclose()
+
+        self.assertEqual(response.json(), {"prediction": 1})
+        self.assertEqual(len(calls), 3)
+
+    async def test_fails_fast_when_circuit_open(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            raise httpx.ConnectError("connection refused")
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        client = self.make_client(handler, max_retries=1, breaker=breaker)
+        with self.assertRaises(httpx.ConnectError):
+            await client.post("/predict", json={})
+        with self.assertRaises(CircuitOpenError):
+            await client.post("/predict", json={})
+        await client.aclose()
+
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest import mock
+
+import httpx
+from prometheus_client import REGISTRY
+from pydantic import ValidationError
+
+import api.prediction_service as prediction_service
+
+
+class TestStartup(unittest.IsolatedAsyncioTestCase):
+
+    async def test_ready_once_the_model_is_loaded(self):
+        app = prediction_service.app
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            self.assertEqual((await client.get('/healthz')).status_code, 200)
+            if prediction_service.models is None:
+                self.assertEqual((await client.get('/readyz')).status_code, 503)
+                self.assertEqual((await client.get('/model')).status_code, 503)
+
+            prediction_service.load_models()
+            async with prediction_service.lifespan(app):
+                response = await client.get('/readyz')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['model_version'], prediction_service.models.store.active.version)
+                self.assertGreater(REGISTRY.get_sample_value('prediction_service_time_to_ready_seconds'), 0)
+
+
+class TestAdminEndpoints(unittest.IsolatedAsyncioTestCase):
+
+    async def test_admin_token_required(self):
+        app = prediction_service.app
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            with mock.patch.object(prediction_service, 'MODEL_ADMIN_TOKEN', None):
+                self.assertEqual((await client.post('/model/rollback')).status_code, 403)
+            with mock.patch.object(prediction_service, 'MODEL_ADMIN_TOKEN', 'secret'):
+                self.assertEqual((await client.post('/model/rollback')).status_code, 401)
+                response = await client.post('/model/reload', headers={'Authorization': 'Bearer wrong'})
+                self.assertEqual(response.status_code, 401)
+                response = await client.post('/model/rollback', headers={'Authorization': 'Bearer secret'})
+                self.assertNotIn(response.status_code, (401, 403))
+
+
+class TestCompactFormat(unittest.TestCase):
+
+    def test_int_fields_reject_fractional_values(self):
+        values = [0.0] * len(prediction_service.SCORING_FIELDS)
+        values[prediction_service.SCORING_FIELDS.index('Shot_Distance')] = 22.5
+        prediction_service.CompactScoringItem(schema_version=1, values=values)
+
+        values[prediction_service.SCORING_FIELDS.index('ShotType_2PT_Field_Goal')] = 0.4
+        with self.assertRaises(ValidationError):
+            prediction_service.CompactScoringItem(schema_version=1, values=values)
+        with self.assertRaises(ValidationError):
+            prediction_service.CompactBatchScoringRequest(schema_version=1, rows=[values])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+from api.prediction_writer import PredictionWriteBuffer
+
+
+class TestPredictionWriteBuffer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_flushes_by_size_and_on_close(self):
+        batches = []
+
+        async def flush(batch):
+            batches.append(list(batch))
+
+        buffer = PredictionWriteBuffer(flush, batch_size=2, flush_interval=60)
+        buffer.start()
+        await buffer.submit([(1, {'a': 1}), (0, {'a': 2}), (1, {'a': 3})])
+        await asyncio.sleep(0)
+        await buffer.close()
+
+        self.assertEqual(batches, [[(1, {'a': 1}), (0, {'a': 2})], [(1, {'a': 3})]])
+
+    async def test_flushes_by_time(self):
+        flushed = asyncio.Event()
+
+        async def flush(batch):
+            flushed.set()
+
+        buffer = PredictionWriteBuffer(flush, batch_size=100, flush_interval=0.01)
+        buffer.start()
+        await buffer.submit([(1, {})])
+        await asyncio.wait_for(flushed.wait(), timeout=1)
+        await buffer.close()
+
+    async def test_retries_failed_flush(self):
+        attempts = []
+
+        async def flush(batch):
+            attempts.append(batch)
+            if len(attempts) == 1:
+                raise RuntimeError("database unavailable")
+
+        buffer = PredictionWriteBuffer(flush, batch_size=1, flush_interval=0, max_attempts=2)
+        buffer.start()
+        await buffer.submit([(1, {})])
+        await buffer.close()
+
+        self.assertEqual(len(attempts), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
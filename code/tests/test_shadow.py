@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+from api.shadow import ShadowScorer
+
+
+def fake_model(version, feature_names, predict):
+    return SimpleNamespace(version=version, layout=SimpleNamespace(feature_names=feature_names), predict=predict)
+
+
+class TestShadowScorer(unittest.IsolatedAsyncioTestCase):
+
+    async def test_records_disagreements_with_the_champion(self):
+        champion = fake_model('champion', ['a', 'b'], None)
+        # The challenger expects the columns the other way round and predicts 1 when its first one is positive
+        challenger = fake_model('challenger', ['b', 'a'], lambda features: (features[:, 0] > 0).astype(int))
+
+        async def get_model(version):
+            return challenger
+
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, 'shadow.jsonl')
+            scorer = ShadowScorer(get_model, ['challenger'], sample_rate=1.0, log_path=log_path)
+            scorer.start()
+            scorer.offer(champion, np.array([[0.0, 1.0]]), [1])
+            scorer.offer(champion, np.array([[1.0, 0.0], [0.0, 0.0]]), [1, 0])
+            await scorer.close()
+
+            with open(log_path) as f:
+                lines = [json.loads(line) for line in f]
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(lines[0]['champion_prediction'], 1)
+        self.assertEqual(lines[0]['challenger_prediction'], 0)
+        self.assertEqual(lines[0]['features'], [1.0, 0.0])
+
+    async def test_samples_and_drops_instead_of_blocking(self):
+        scorer = ShadowScorer(None, ['challenger'], sample_rate=0.0)
+        scorer.offer(None, np.zeros((1, 2)), [0])
+        self.assertTrue(scorer.queue.empty())
+
+        scorer = ShadowScorer(None, ['challenger'], sample_rate=1.0, max_queue_size=1)
+        scorer.offer(None, np.zeros((1, 2)), [0])
+        scorer.offer(None, np.zeros((1, 2)), [0])
+        self.assertEqual(scorer.queue.qsize(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
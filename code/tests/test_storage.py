@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from training_pipeline.storage import read_table, write_table, import_csv, export_csv
+from training_pipeline.storage import append_segment, iter_dataset, read_dataset, read_manifest, verify_dataset
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp.name, 'shots.parquet')
+        self.data = pd.DataFrame({
+            'Game Date': [19990324, 20020216, 20181228],
+            'Season Type': ['Regular Season', 'Playoffs', 'Regular Season'],
+            'Shot Distance': [22, 0, 26],
+            'Action Type_Frequency': [0.25, 0.5, 0.25],
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_keeps_column_types(self):
+        write_table(self.data, self.file_path)
+        pd.testing.assert_frame_equal(read_table(self.file_path), self.data)
+
+    def test_read_columns_and_rows(self):
+        write_table(self.data, self.file_path)
+        result = read_table(self.file_path, columns=['Game Date', 'Shot Distance'],
+                            filters=[('Season Type', '==', 'Regular Season'), ('Game Date', '>=', 20000101)])
+        expected = pd.DataFrame({'Game Date': [20181228], 'Shot Distance': [26]})
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_csv_import_and_export(self):
+        csv_path = os.path.join(self.tmp.name, 'shots.csv')
+        self.data.to_csv(csv_path, index=False)
+        import_csv(csv_path, self.file_path)
+        pd.testing.assert_frame_equal(read_table(self.file_path), self.data)
+
+        export_path = os.path.join(self.tmp.name, 'export.csv')
+        export_csv(self.file_path, export_path, columns=['Season Type'])
+        pd.testing.assert_frame_equal(pd.read_csv(export_path), self.data[['Season Type']])
+
+
+class TestSegmentedDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dataset_dir = os.path.join(self.tmp.name, 'raw')
+        self.first = pd.DataFrame({'Game Date': [19990324, 20020216], 'Shot Distance': [22, 0]})
+        self.second = pd.DataFrame({'Game Date': [20181228], 'Shot Distance': [26.0]})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_union_of_segments(self):
+        self.assertTrue(read_dataset(self.dataset_dir).empty)
+        append_segment(self.first, self.dataset_dir)
+        append_segment(self.second, self.dataset_dir, source='new_data.csv')
+
+        # The second batch is cast to the types set by the first one
+        expected = pd.DataFrame({'Game Date': [19990324, 20020216, 20181228], 'Shot Distance': [22, 0, 26]})
+        pd.testing.assert_frame_equal(read_dataset(self.dataset_dir), expected)
+        pieces = list(iter_dataset(self.dataset_dir, columns=['Game Date'], batch_size=1))
+        self.assertEqual([len(piece) for piece in pieces], [1, 1, 1])
+        pieces = list(iter_dataset(self.dataset_dir, columns=['Game Date'], filters=[('Shot Distance', '>', 0)]))
+        pd.testing.assert_frame_equal(pd.concat(pieces, ignore_index=True),
+                                      pd.DataFrame({'Game Date': [19990324, 20181228]}))
+        manifest = read_manifest(self.dataset_dir)
+        self.assertEqual([(segment['rows'], segment['source']) for segment in manifest['segments']],
+                         [(2, None), (1, 'new_data.csv')])
+
+    def test_pieces_have_the_dataset_column_types(self):
+        append_segment(self.first, self.dataset_dir)
+        append_segment(pd.DataFrame({'Game Date': [20181228], 'Shot Distance': [None]}), self.dataset_dir)
+
+        # 'Shot Distance' has a missing value in the second segment only, it is float64 in every piece
+        self.assertEqual(read_dataset(self.dataset_dir)['Shot Distance'].dtype, 'float64')
+        pieces = list(iter_dataset(self.dataset_dir, batch_size=1))
+        self.assertEqual([piece['Shot Distance'].dtype for piece in pieces], ['float64'] * 3)
+        self.assertEqual([piece['Game Date'].dtype for piece in pieces], ['int64'] * 3)
+
+    def test_rejects_batches_not_matching_the_schema(self):
+        append_segment(self.first, self.dataset_dir)
+        with self.assertRaises(ValueError):
+            append_segment(self.first.rename(columns={'Shot Distance': 'Distance'}), self.dataset_dir)
+        with self.assertRaises(ValueError):
+            append_segment(pd.DataFrame({'Game Date': [20181228], 'Shot Distance': [26.5]}), self.dataset_dir)
+        self.assertEqual(len(read_manifest(self.dataset_dir)['segments']), 1)
+
+    def test_verify_and_uncommitted_segments(self):
+        segment = append_segment(self.first, self.dataset_dir)
+        self.assertEqual(verify_dataset(self.dataset_dir), [])
+
+        # A segment written by an ingest that crashed before committing the manifest is not read
+        write_table(self.second, os.path.join(self.dataset_dir, 'segment-000001.parquet'))
+        pd.testing.assert_frame_equal(read_dataset(self.dataset_dir), self.first)
+
+        with open(os.path.join(self.dataset_dir, segment['file']), 'ab') as f:
+            f.write(b'garbage')
+        self.assertEqual(verify_dataset(self.dataset_dir), [segment['file']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,6 +12,7 @@ sys.path.insert(0, code_dir)
 
 from logs.logger import logger
 from config.config import Config
+from training_pipeline.storage import append_segment, read_manifest, read_table
 
 
 def fetch_data_from_csv(file_path):
@@ -69,34 +70,51 @@ def append_data(existing_data, new_data):
     return combined_data
 
 
-def save_data(data, file_path):
+def save_data(data, dataset_dir, source=None):
     """
-    Saves data to a CSV file.
+    Saves data as a new segment of the raw dataset, leaving the existing segments untouched.
 
     Parameters:
     data (DataFrame): The data to save.
-    file_path (str): The path to the CSV file to save.
+    dataset_dir (str): The segmented dataset directory.
+    source (str): Where the data came from, recorded in the manifest.
     """
-    # Create parent directory if it doesn't exist
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-    logger.info(f"Saving data to CSV file: {file_path}")
-    data.to_csv(file_path, index=False)
+    append_segment(data, dataset_dir, source)
     logger.info("Data saved successfully.")
 
 
+def import_legacy_data(dataset_dir, legacy_file_paths):
+    """
+    Imports the raw data of older versions, a single Parquet or CSV file, as the first segment
+    of a dataset that has none yet.
+
+    Parameters:
+    dataset_dir (str): The segmented dataset directory.
+    legacy_file_paths (list of str): Candidate files, the first existing one is imported.
+    """
+    if read_manifest(dataset_dir)['segments']:
+        return
+    for file_path in legacy_file_paths:
+        if os.path.exists(file_path):
+            if file_path.endswith('.parquet'):
+                legacy_data = read_table(file_path)
+            else:
+                legacy_data = fetch_data_from_csv(file_path)
+            save_data(legacy_data, dataset_dir, source=file_path)
+            return
+
+
 def main():
     """
     Main function to execute the data processing workflow:
     - Fetches new data from a CSV file.
     - Validates the new data.
-    - Appends the new data to existing data if it exists.
-    - Saves the combined data to a CSV file.
+    - Appends the new data to the raw dataset as a new segment.
     """
     logger.info("(1) Starting the data ingestion process.")
 
     input_file_path = '../../' + Config.NEW_DATA_FILE
-    output_file_path = '../../' + Config.OUTPUT_RAW_FILE
+    output_dir = '../../' + Config.OUTPUT_RAW_DIR
 
     # Fetch new data
     new_data = fetch_data_from_csv(input_file_path)
@@ -104,17 +122,12 @@ def main():
     # Validate new data
     validated_new_data = validate_data(new_data)
 
-    # Check if raw data file already exists and read it
-    if os.path.exists(output_file_path):
-        existing_data = fetch_data_from_csv(output_file_path)
-    else:
-        existing_data = pd.DataFrame()
-
-    # Append new data to existing data
-    combined_data = append_data(existing_data, validated_new_data)
+    # Raw data of an older version starts the segmented dataset
+    import_legacy_data(output_dir, ['../../' + file_path for file_path in Config.LEGACY_RAW_FILES])
 
-    # Save combined data
-    save_data(combined_data, output_file_path)
+    # Only the new batch is written, the existing data is not read
+    if not validated_new_data.empty:
+        save_data(validated_new_data, output_dir, source=input_file_path)
 
     # Each service script creates its signal file at the end
     open('signal_data_ingestion_done', 'w').close()
@@ -1,6 +1,10 @@
 import sys
 import os
+from collections import Counter
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # Adjust sys.path to include the 'project' directory
 project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -11,6 +15,25 @@ sys.path.insert(0, code_dir)
 
 from logs.logger import logger
 from config.config import Config
+from training_pipeline.storage import atomic_write, iter_dataset, manifest_schema, read_dataset, read_manifest, write_table
+
+# Rows per chunk in the out-of-core mode, which holds one chunk at a time instead of the whole
+# dataset. 0 processes the dataset in memory.
+CHUNK_ROWS = int(os.getenv("DATA_PROCESSING_CHUNK_ROWS", "0"))
+
+HIGH_CARDINALITY_COLUMNS = ['Action Type', 'Team Name', 'Home Team', 'Away Team']
+UNIQUE_ID_COLUMNS = ['Game ID', 'Game Event ID', 'Player ID']
+# Categorical column to the prefix of its one-hot columns
+ONE_HOT_COLUMNS = {
+    'Shot Type': 'ShotType',
+    'Shot Zone Basic': 'ShotZoneBasic',
+    'Shot Zone Area': 'ShotZoneArea',
+    'Shot Zone Range': 'ShotZoneRange',
+    'Season Type': 'SeasonType',
+}
+
+# Odd 64-bit constant scrambling numbers for the second half of row_fingerprints
+FINGERPRINT_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
 
 
 def clean_data(data):
@@ -28,19 +51,21 @@ def clean_data(data):
     return data
 
 
-def transform_data(data):
+def transform_data(data, frequencies=None, categories=None):
     """
     Transform the data by encoding categorical and quantitative attributes.
 
     Parameters:
     data (DataFrame): The input DataFrame to be transformed.
+    frequencies (dict): Frequency of each value by column, computed from data by default.
+    categories (dict): Categories of each one-hot encoded column, those present in data by default.
 
     Returns:
     DataFrame: The transformed DataFrame.
     """
-    data = transform_attributes_with_high_cardinality(data)
-    data = one_hot_encoding(data)
-    data = transform_quantitative_attributes_with_unique_ids(data)
+    data = transform_attributes_with_high_cardinality(data, frequencies)
+    data = one_hot_encoding(data, categories)
+    data = transform_quantitative_attributes_with_unique_ids(data, frequencies)
 
     if 'Player Name' in data.columns:
         data.drop(['Player Name'], axis=1, inplace=True)  # Remove 'Player Name' column if exists
@@ -50,92 +75,246 @@ def transform_data(data):
     return data
 
 
-def transform_quantitative_attributes_with_unique_ids(data):
+def transform_quantitative_attributes_with_unique_ids(data, frequencies=None):
     """
     Transform quantitative attributes with unique IDs by applying frequency encoding.
 
     Parameters:
     data (DataFrame): The input DataFrame.
+    frequencies (dict): Frequency of each value by column, computed from data by default.
 
     Returns:
     DataFrame: The DataFrame with frequency-encoded quantitative attributes.
     """
-    frequency_encode_column(data, 'Game ID')
-    frequency_encode_column(data, 'Game Event ID')
-    frequency_encode_column(data, 'Player ID')
-    data.drop(['Game ID', 'Game Event ID', 'Player ID'], axis=1, inplace=True)
+    for column_name in UNIQUE_ID_COLUMNS:
+        frequency_encode_column(data, column_name, frequencies[column_name] if frequencies else None)
+    data.drop(UNIQUE_ID_COLUMNS, axis=1, inplace=True)
     return data
 
 
-def one_hot_encoding(data):
+def one_hot_encoding(data, categories=None):
     """
     Perform one-hot encoding for each categorical column.
 
     Parameters:
     data (DataFrame): The input DataFrame.
+    categories (dict): Categories of each column, in column order, those present in data by default.
+        Every category gets a column, even if data has none of it.
 
     Returns:
     DataFrame: The DataFrame with one-hot encoded categorical attributes.
     """
-    shot_type_encoded = pd.get_dummies(data['Shot Type'], prefix='ShotType', dtype=int)
-    shot_zone_basic_encoded = pd.get_dummies(data['Shot Zone Basic'], prefix='ShotZoneBasic', dtype=int)
-    shot_zone_area_encoded = pd.get_dummies(data['Shot Zone Area'], prefix='ShotZoneArea', dtype=int)
-    shot_zone_range_encoded = pd.get_dummies(data['Shot Zone Range'], prefix='ShotZoneRange', dtype=int)
-    season_type_encoded = pd.get_dummies(data['Season Type'], prefix='SeasonType', dtype=int)
-
-    data = pd.concat([data, shot_type_encoded, shot_zone_basic_encoded, shot_zone_area_encoded, shot_zone_range_encoded, season_type_encoded], axis=1)
-    data.drop(['Shot Type', 'Shot Zone Basic', 'Shot Zone Area', 'Shot Zone Range', 'Season Type'], axis=1, inplace=True)
+    encoded = []
+    for column_name, prefix in ONE_HOT_COLUMNS.items():
+        column = data[column_name]
+        if categories:
+            column = pd.Series(pd.Categorical(column, categories=categories[column_name]), index=data.index)
+        encoded.append(pd.get_dummies(column, prefix=prefix, dtype=int))
+
+    data = pd.concat([data] + encoded, axis=1)
+    data.drop(list(ONE_HOT_COLUMNS), axis=1, inplace=True)
     return data
 
 
-def transform_attributes_with_high_cardinality(data):
+def transform_attributes_with_high_cardinality(data, frequencies=None):
     """
     Transform attributes with high cardinality by applying frequency encoding.
 
     Parameters:
     data (DataFrame): The input DataFrame.
+    frequencies (dict): Frequency of each value by column, computed from data by default.
 
     Returns:
     DataFrame: The DataFrame with frequency-encoded high cardinality attributes.
     """
-    frequency_encode_column(data, 'Action Type')
-    frequency_encode_column(data, 'Team Name')
-    frequency_encode_column(data, 'Home Team')
-    frequency_encode_column(data, 'Away Team')
-    data.drop(['Action Type', 'Team Name', 'Home Team', 'Away Team'], axis=1, inplace=True)
+    for column_name in HIGH_CARDINALITY_COLUMNS:
+        frequency_encode_column(data, column_name, frequencies[column_name] if frequencies else None)
+    data.drop(HIGH_CARDINALITY_COLUMNS, axis=1, inplace=True)
     return data
 
 
-def frequency_encode_column(data, column_name):
+def frequency_encode_column(data, column_name, frequency=None):
     """
     Perform frequency encoding on a specified column.
 
     Parameters:
     data (DataFrame): The input DataFrame.
     column_name (str): The name of the column to be frequency encoded.
+    frequency (Series): Frequency of each value, computed from data by default.
 
     Returns:
     DataFrame: The DataFrame with the frequency-encoded column.
     """
-    frequency = data[column_name].value_counts(normalize=True)
+    if frequency is None:
+        frequency = data[column_name].value_counts(normalize=True)
     data[column_name + '_Frequency'] = data[column_name].map(frequency)
     return data
 
 
+def row_fingerprints(data):
+    """
+    128-bit fingerprint of each row, from two 64-bit hashes of all its values.
+
+    pandas keys only the hash of strings, numbers hash the same whatever the key. For the second
+    hash, numbers are therefore first multiplied by an odd constant modulo 2**64, a bijection, so
+    the two halves differ for every column type.
+
+    Returns:
+    tuple of ndarray: The two halves, one entry per row.
+    """
+    first = {}
+    second = {}
+    for column_name, column in data.items():
+        values = column.to_numpy()
+        if values.dtype.kind in 'fiub':
+            # + 0.0 turns -0.0 into 0.0, which drop_duplicates considers equal
+            values = values.astype('float64') + 0.0 if values.dtype.kind == 'f' else values.astype('int64')
+            first[column_name] = values
+            second[column_name] = values.view('u8') * FINGERPRINT_MULTIPLIER
+        else:
+            first[column_name] = second[column_name] = values
+    return (pd.util.hash_pandas_object(pd.DataFrame(first), index=False).to_numpy(),
+            pd.util.hash_pandas_object(pd.DataFrame(second), index=False, hash_key='6543210987654321').to_numpy())
+
+
+def find_kept_rows(input_dir, chunk_rows):
+    """
+    First pass of the chunked mode: the rows clean_data keeps, those without missing values
+    that do not repeat an earlier row.
+
+    Only the row fingerprints are held, 16 bytes per row, instead of the rows themselves.
+
+    Parameters:
+    input_dir (str): The segmented raw dataset.
+    chunk_rows (int): Rows read at a time.
+
+    Returns:
+    ndarray of bool: One entry per row of the dataset, in order.
+    """
+    valid_parts, high_parts, low_parts = [], [], []
+    for chunk in iter_dataset(input_dir, batch_size=chunk_rows):
+        valid = chunk.notna().all(axis=1).to_numpy()
+        high, low = row_fingerprints(chunk[valid])
+        valid_parts.append(valid)
+        high_parts.append(high)
+        low_parts.append(low)
+    if not valid_parts:
+        return np.zeros(0, dtype=bool)
+    valid = np.concatenate(valid_parts)
+    high = np.concatenate(high_parts)
+    low = np.concatenate(low_parts)
+    del valid_parts, high_parts, low_parts
+
+    # The sort is stable, so each run of equal fingerprints starts with its earliest row
+    order = np.lexsort((low, high))
+    high, low = high[order], low[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = (high[1:] != high[:-1]) | (low[1:] != low[:-1])
+
+    keep = np.zeros(len(valid), dtype=bool)
+    keep[np.flatnonzero(valid)[order[first]]] = True
+    return keep
+
+
+def count_values(input_dir, keep, chunk_rows):
+    """
+    Second pass of the chunked mode: the value frequencies and categories transform_data would
+    compute on the whole cleaned dataset. Only the encoded columns are read.
+
+    Parameters:
+    input_dir (str): The segmented raw dataset.
+    keep (ndarray of bool): The rows to count, see find_kept_rows.
+    chunk_rows (int): Rows read at a time.
+
+    Returns:
+    tuple of dict: Frequency of each value by frequency encoded column, and sorted categories by
+    one-hot encoded column.
+    """
+    frequency_columns = HIGH_CARDINALITY_COLUMNS + UNIQUE_ID_COLUMNS
+    counts = {column_name: Counter() for column_name in frequency_columns}
+    categories = {column_name: set() for column_name in ONE_HOT_COLUMNS}
+    offset = 0
+    for chunk in iter_dataset(input_dir, columns=frequency_columns + list(ONE_HOT_COLUMNS), batch_size=chunk_rows):
+        chunk_keep = keep[offset:offset + len(chunk)]
+        offset += len(chunk)
+        chunk = chunk[chunk_keep]
+        for column_name in frequency_columns:
+            counts[column_name].update(chunk[column_name].value_counts().to_dict())
+        for column_name in ONE_HOT_COLUMNS:
+            categories[column_name].update(chunk[column_name].unique())
+
+    frequencies = {}
+    for column_name, column_counts in counts.items():
+        # Same as value_counts(normalize=True) over the whole column
+        column_counts = pd.Series(column_counts, dtype='int64')
+        frequencies[column_name] = column_counts / column_counts.sum()
+    return frequencies, {column_name: sorted(values) for column_name, values in categories.items()}
+
+
+def process_in_chunks(input_dir, output_file_path, chunk_rows):
+    """
+    Clean and transform the raw dataset a chunk at a time, writing the output as it goes.
+
+    The output is the same as transform_data(clean_data(data)) on the whole dataset: duplicates
+    and value frequencies are resolved over the whole dataset by two reading passes before a
+    third one encodes each chunk with them.
+
+    Parameters:
+    input_dir (str): The segmented raw dataset.
+    output_file_path (str): The path to the Parquet file, replaced once complete.
+    chunk_rows (int): Rows held in memory at a time.
+    """
+    keep = find_kept_rows(input_dir, chunk_rows)
+    logger.info(f"Keeping {int(keep.sum())} of {len(keep)} rows after removing missing values and duplicates.")
+    if not keep.any():
+        # Nothing survives cleaning: transform an empty frame with the dataset's columns and types
+        manifest = read_manifest(input_dir)
+        empty = manifest_schema(manifest).empty_table().to_pandas() if manifest['schema'] else pd.DataFrame()
+        write_table(transform_data(empty), output_file_path)
+        return
+    frequencies, categories = count_values(input_dir, keep, chunk_rows)
+
+    def write(path):
+        writer = None
+        offset = 0
+        try:
+            for chunk in iter_dataset(input_dir, batch_size=chunk_rows):
+                chunk_keep = keep[offset:offset + len(chunk)]
+                offset += len(chunk)
+                if not chunk_keep.any():
+                    continue
+                chunk = transform_data(chunk[chunk_keep].copy(), frequencies, categories)
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='snappy')
+                # The file has one schema, the first chunk's
+                writer.write_table(table.cast(writer.schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+    logger.info(f"Saving data to Parquet file: {output_file_path}")
+    atomic_write(output_file_path, write)
+
+
 def main():
     """
     Main function to load, clean, transform, and save the dataset.
     """
     logger.info("(2) Starting the data processing process.")
 
-    input_file_path = '../../' + Config.OUTPUT_RAW_FILE
+    input_file_path = '../../' + Config.OUTPUT_RAW_DIR
     output_file_path = '../../' + Config.OUTPUT_PREPROCESSED_FILE
     logger.info(f"Data loaded from {input_file_path}.")
 
-    data = pd.read_csv(input_file_path)
-    data = clean_data(data)
-    data = transform_data(data)
-    data.to_csv(output_file_path, index=False)
+    if CHUNK_ROWS:
+        process_in_chunks(input_file_path, output_file_path, CHUNK_ROWS)
+    else:
+        data = read_dataset(input_file_path)
+        data = clean_data(data)
+        data = transform_data(data)
+        write_table(data, output_file_path)
     logger.info(output_file_path)
 
     # Each service script creates its signal file at the end
@@ -14,6 +14,7 @@ sys.path.insert(0, code_dir)
 
 from logs.logger import logger
 from config.config import Config
+from training_pipeline.storage import read_table
 
 
 def create_features(data):
@@ -59,7 +60,7 @@ def transform_date_attribute(data):
 def split_train_and_test_parts(data):
     """
     Function to split the dataset into training and testing parts,
-    and save them as a joblib file.
+    and save them as a joblib file, together with the fitted scaler.
 
     Args:
     data (pd.DataFrame): The input dataframe with features and target variable.
@@ -94,6 +95,11 @@ def split_train_and_test_parts(data):
     logger.info("New joblib file generated successfully.")
     logger.info(output_file_path)
 
+    # Save the fitted scaler, so model training can fold it into the exported scoring artifact
+    scaler_file_path = '../../' + Config.OUTPUT_SCALER_JOBLIB_FILE
+    dump((scaler, columns_to_scale), scaler_file_path)
+    logger.info(scaler_file_path)
+
 
 def main():
     """
@@ -101,10 +107,10 @@ def main():
     """
     logger.info("(3) Starting the feature engineering process.")
 
-    # Load the processed data from CSV file
+    # Load the processed data from Parquet file
     input_file_path = '../../' + Config.OUTPUT_PREPROCESSED_FILE
     logger.info(f"Loading data from {input_file_path}.")
-    data = pd.read_csv(input_file_path)
+    data = read_table(input_file_path)
 
     # Create features
     data = create_features(data)
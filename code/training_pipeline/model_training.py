@@ -21,6 +21,7 @@ sys.path.insert(0, code_dir)
 
 from logs.logger import logger
 from config.config import Config
+from api.linear_scorer import fuse_scaler, scorer_path_for
 
 
 def load_best_metrics(metrics_file_path):
@@ -150,6 +151,26 @@ def generate_versioned_filename(base_filename, version):
     return f"{base_filename}-v{version}-{current_date}.joblib"
 
 
+def export_scoring_artifact(model, scaler_file_path, model_file_path):
+    """
+    Fold the feature scaler into the model weights and save the result next to the model file.
+    The prediction service scores raw feature values from it with NumPy only.
+
+    Parameters:
+    model: Trained logistic regression model.
+    scaler_file_path (str): Path to the joblib file with the fitted scaler and its columns.
+    model_file_path (str): Path the model itself is saved to.
+
+    Returns:
+    str: Path of the scoring artifact.
+    """
+    scaler, scaled_columns = load(scaler_file_path)
+    version = os.path.splitext(os.path.basename(model_file_path))[0]
+    scorer_file_path = scorer_path_for(model_file_path)
+    fuse_scaler(model, scaler, scaled_columns, version).save(scorer_file_path)
+    return scorer_file_path
+
+
 def ensure_directory_exists(file_path):
     """
     Ensure the directory for the specified file path exists.
@@ -192,8 +213,15 @@ def main():
     print(f"Best current Accuracy: {best_accuracy}")
 
     if new_accuracy > best_accuracy:
-        # Save the model to the original path
+        # Save the model to the original path. The scoring artifact is written first, so the
+        # prediction service never picks up the model file without it.
         ensure_directory_exists(versioned_filename)
+        scaler_file_path = '../../' + Config.OUTPUT_SCALER_JOBLIB_FILE
+        if os.path.exists(scaler_file_path):
+            scorer_file_path = export_scoring_artifact(model, scaler_file_path, versioned_filename)
+            logger.info(f"Scoring artifact saved to {scorer_file_path}.")
+        else:
+            logger.warning(f"No scaler found at {scaler_file_path}, skipping the scoring artifact.")
         dump(model, versioned_filename)
         logger.info("Model file data saved successfully.")
         logger.info(versioned_filename)
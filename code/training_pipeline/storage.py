@@ -0,0 +1,346 @@
+"""
+Columnar storage of the pipeline intermediates (raw and preprocessed shot data) as Parquet.
+
+Parquet keeps the column types, so each stage reads back exactly what the previous one wrote
+instead of re-inferring dtypes from text. A reader can also load only the columns it needs
+(projection) and skip the row groups whose min/max statistics rule out its filters (predicate
+pushdown). CSV is only used to bring data in (new_data.csv, raw files of older pipeline
+versions) and to export a table for inspection.
+
+The raw data is a segmented dataset: a directory with one immutable Parquet segment per
+ingested batch and a manifest (manifest.json) listing the committed segments with their row
+counts and SHA-256, and the schema every segment is cast to. Appending writes only the new
+segment and a new manifest, each to a temporary file that is then renamed over the target, so
+a crash leaves either the previous or the new state. Segment files missing from the manifest,
+e.g. left by a crashed ingest, are ignored. There is one writer at a time, the pipeline.
+
+Example:
+    python storage.py export "../../data/processed/NBA Shot Locations 1997 - 2020-processed.parquet" processed.csv
+    python storage.py import "../../data/raw/NBA Shot Locations 1997 - 2020.csv" "../../data/raw/NBA Shot Locations 1997 - 2020.parquet"
+    python storage.py verify "../../data/raw/NBA Shot Locations 1997 - 2020"
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Adjust sys.path to include the 'project' directory
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, project_dir)
+
+code_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, code_dir)
+
+from logs.logger import logger
+
+# Rows per Parquet row group, the unit predicate pushdown can skip
+ROW_GROUP_SIZE = 100_000
+
+MANIFEST_FILE = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def read_table(file_path, columns=None, filters=None):
+    """
+    Reads a table written by write_table.
+
+    Parameters:
+    file_path (str): The path to the Parquet file.
+    columns (list of str): Only read these columns, all of them by default.
+    filters (list of tuple): Only read the rows matching all (column, op, value) conditions,
+        e.g. [('Season Type', '==', 'Playoffs'), ('Game Date', '>=', 20150101)].
+
+    Returns:
+    DataFrame: The table, with the column types it was written with.
+    """
+    logger.info(f"Reading data from Parquet file: {file_path}")
+    return pd.read_parquet(file_path, engine='pyarrow', columns=columns, filters=filters)
+
+
+def write_table(data, file_path):
+    """
+    Writes a DataFrame to a Parquet file, replacing it if it exists.
+
+    Parameters:
+    data (DataFrame): The data to save. The index is not stored.
+    file_path (str): The path to the Parquet file.
+    """
+    # Create parent directory if it doesn't exist
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    logger.info(f"Saving data to Parquet file: {file_path}")
+    data.to_parquet(file_path, engine='pyarrow', index=False, compression='snappy', row_group_size=ROW_GROUP_SIZE)
+
+
+def import_csv(csv_path, file_path):
+    """
+    Converts a CSV file into a Parquet table. Column types are inferred once, here.
+    """
+    write_table(pd.read_csv(csv_path), file_path)
+
+
+def export_csv(file_path, csv_path, columns=None):
+    """
+    Writes a Parquet table, or some of its columns, to a CSV file.
+    """
+    read_table(file_path, columns=columns).to_csv(csv_path, index=False)
+
+
+def atomic_write(file_path, write):
+    """
+    Writes a file through a temporary file in the same directory, renamed over file_path once
+    complete and flushed to disk.
+
+    Parameters:
+    file_path (str): The file to create or replace.
+    write (callable): Called with the temporary path, writes the content there.
+    """
+    directory = os.path.dirname(file_path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    os.close(fd)
+    try:
+        write(tmp_path)
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(dataset_dir):
+    """
+    Reads the manifest of a segmented dataset.
+
+    Parameters:
+    dataset_dir (str): The dataset directory.
+
+    Returns:
+    dict: 'schema' (Arrow type by column name, in column order) and 'segments', in ingestion order,
+    each with 'file', 'rows', 'sha256', 'created_at' and 'source'. No segments if the
+    dataset does not exist yet.
+    """
+    manifest_path = os.path.join(dataset_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {'version': MANIFEST_VERSION, 'schema': None, 'segments': []}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def manifest_schema(manifest):
+    return pa.schema([(name, pa.type_for_alias(type_name)) for name, type_name in manifest['schema'].items()])
+
+
+def append_segment(data, dataset_dir, source=None):
+    """
+    Adds a batch to a segmented dataset as a new segment. Only the batch is written, whatever
+    the size of the dataset.
+
+    Parameters:
+    data (DataFrame): The batch. The first batch sets the schema, later ones are cast to it.
+    dataset_dir (str): The dataset directory, created if needed.
+    source (str): Where the batch came from, recorded in the manifest.
+
+    Returns:
+    dict: The manifest entry of the new segment.
+
+    Raises:
+    ValueError: If the batch does not have the dataset's columns or cannot be cast safely to its types.
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest = read_manifest(dataset_dir)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    if manifest['schema'] is None:
+        manifest['schema'] = {field.name: str(field.type) for field in table.schema}
+    else:
+        schema = manifest_schema(manifest)
+        if table.schema.names != schema.names:
+            raise ValueError(f"Batch columns {table.schema.names} do not match the dataset columns {schema.names}")
+        try:
+            table = table.cast(schema)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            raise ValueError(f"Batch does not match the dataset schema: {e}")
+
+    # Segments are numbered in ingestion order, a number is only taken once its manifest is committed
+    file_name = f"segment-{len(manifest['segments']):06d}.parquet"
+    segment_path = os.path.join(dataset_dir, file_name)
+    atomic_write(segment_path, lambda path: pq.write_table(table, path, compression='snappy',
+                                                           row_group_size=ROW_GROUP_SIZE))
+    segment = {
+        'file': file_name,
+        'rows': table.num_rows,
+        'sha256': file_sha256(segment_path),
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+    }
+    manifest['segments'].append(segment)
+
+    def write_manifest(path):
+        with open(path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+    atomic_write(os.path.join(dataset_dir, MANIFEST_FILE), write_manifest)
+    logger.info(f"Appended segment {file_name} with {table.num_rows} rows to {dataset_dir}")
+    return segment
+
+
+def open_dataset(dataset_dir):
+    """
+    Lazy union of the committed segments of a segmented dataset, nothing is read until it is scanned.
+
+    Returns:
+    pyarrow.dataset.Dataset: The segments in ingestion order, or None if there are none yet.
+    """
+    manifest = read_manifest(dataset_dir)
+    if not manifest['segments']:
+        return None
+    paths = [os.path.join(dataset_dir, segment['file']) for segment in manifest['segments']]
+    return ds.dataset(paths, schema=manifest_schema(manifest), format='parquet')
+
+
+def nullable_integer_columns(dataset_dir):
+    """
+    The integer columns with a missing value in some committed segment, from the null counts
+    in the segment footers. Only segments without these statistics are read, one column at a time.
+
+    Returns:
+    set of str: The column names, which pandas reads as float64 for the whole dataset.
+    """
+    manifest = read_manifest(dataset_dir)
+    if not manifest['segments']:
+        return set()
+    candidates = [field.name for field in manifest_schema(manifest) if pa.types.is_integer(field.type)]
+    nullable = set()
+    for segment in manifest['segments']:
+        parquet_file = pq.ParquetFile(os.path.join(dataset_dir, segment['file']))
+        metadata = parquet_file.metadata
+        names = metadata.schema.names
+        for column_name in candidates:
+            if column_name in nullable:
+                continue
+            index = names.index(column_name)
+            for row_group in range(metadata.num_row_groups):
+                statistics = metadata.row_group(row_group).column(index).statistics
+                if statistics is None or not statistics.has_null_count:
+                    null_count = parquet_file.read_row_group(row_group, columns=[column_name]).column(0).null_count
+                else:
+                    null_count = statistics.null_count
+                if null_count:
+                    nullable.add(column_name)
+                    break
+    return nullable
+
+
+def iter_dataset(dataset_dir, columns=None, filters=None, batch_size=ROW_GROUP_SIZE):
+    """
+    Reads a segmented dataset piece by piece, holding at most about batch_size rows at a time.
+
+    Every piece has the column types read_dataset gives the whole dataset: an integer column
+    with a missing value anywhere is float64 in all of them, not only in those with the missing value.
+
+    Parameters:
+    dataset_dir (str): The dataset directory.
+    columns (list of str): Only read these columns, all of them by default.
+    filters (list of tuple): Only read the rows matching all (column, op, value) conditions.
+    batch_size (int): Maximum rows per piece.
+
+    Yields:
+    DataFrame: Consecutive pieces of the dataset, in ingestion order.
+    """
+    # Segment by segment rather than through a dataset scanner, which decodes ahead of a slow
+    # consumer and can hold far more than batch_size rows
+    read_columns = columns
+    expression = None
+    if filters:
+        expression = pq.filters_to_expression(filters)
+        if columns is not None:
+            read_columns = list(dict.fromkeys(columns + [column for column, _, _ in filters]))
+    nullable = nullable_integer_columns(dataset_dir)
+    for segment in read_manifest(dataset_dir)['segments']:
+        parquet_file = pq.ParquetFile(os.path.join(dataset_dir, segment['file']))
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=read_columns):
+            table = pa.Table.from_batches([batch])
+            if expression is not None:
+                table = table.filter(expression).select(columns or table.column_names)
+            if table.num_rows:
+                piece = table.to_pandas()
+                yield piece.astype({column: 'float64' for column in piece.columns if column in nullable})
+
+
+def read_dataset(dataset_dir, columns=None, filters=None):
+    """
+    Reads a segmented dataset into one DataFrame, the segments concatenated in ingestion order.
+
+    Parameters are the same as iter_dataset.
+    """
+    dataset = open_dataset(dataset_dir)
+    if dataset is None:
+        return pd.DataFrame()
+    logger.info(f"Reading data from segmented dataset: {dataset_dir}")
+    expression = pq.filters_to_expression(filters) if filters else None
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
+
+
+def verify_dataset(dataset_dir):
+    """
+    Checks the committed segments against the row counts and hashes of the manifest.
+
+    Returns:
+    list of str: The files that are missing or do not match, empty if the dataset is intact.
+    """
+    corrupt = []
+    for segment in read_manifest(dataset_dir)['segments']:
+        segment_path = os.path.join(dataset_dir, segment['file'])
+        if (not os.path.exists(segment_path) or file_sha256(segment_path) != segment['sha256']
+                or pq.ParquetFile(segment_path).metadata.num_rows != segment['rows']):
+            corrupt.append(segment['file'])
+    return corrupt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    import_parser = commands.add_parser('import', help='Convert a CSV file into a Parquet table')
+    import_parser.add_argument('csv_path')
+    import_parser.add_argument('file_path')
+    export_parser = commands.add_parser('export', help='Write a Parquet table to a CSV file')
+    export_parser.add_argument('file_path')
+    export_parser.add_argument('csv_path')
+    export_parser.add_argument('--columns', nargs='+', help='Only export these columns')
+    verify_parser = commands.add_parser('verify', help='Check the segments of a segmented dataset against its manifest')
+    verify_parser.add_argument('dataset_dir')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        import_csv(args.csv_path, args.file_path)
+    elif args.command == 'export':
+        export_csv(args.file_path, args.csv_path, args.columns)
+    else:
+        corrupt = verify_dataset(args.dataset_dir)
+        for file_name in corrupt:
+            print(f"Corrupt or missing segment: {file_name}")
+        sys.exit(1 if corrupt else 0)
+
+
+if __name__ == "__main__":
+    main()